@@ -0,0 +1,177 @@
+import os
+import time
+import hashlib
+import mimetypes
+from typing import Dict, Optional
+from urllib.parse import quote, urlparse
+
+import aiohttp
+from aiohttp import web
+from astrbot.api import logger
+from .constant import (
+    ASSETS_DIR,
+    ASSET_CACHE_MAX_AGE,
+    IMAGE_CACHE_EXPIRE_DAYS,
+    IMAGE_PROXY_HOSTS,
+)
+
+
+class AssetServer:
+    """
+    本地静态资源与图片代理服务器。
+    渲染时以 URL 引用 banner/logo 等资源以及 B 站图片，避免把大体积的 base64 塞进每次渲染请求，
+    同时配合长缓存头让渲染端浏览器在多次渲染之间复用缓存。
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        host: str = "127.0.0.1",
+        port: int = 18086,
+        public_url: str = "",
+        user_agent: Optional[str] = None,
+    ):
+        self.cache_dir = cache_dir
+        self.host = host
+        self.port = port
+        # 渲染服务访问本服务器时使用的地址，t2i 服务不在本机时需要填写
+        self.public_url = (public_url or f"http://127.0.0.1:{port}").rstrip("/")
+        self.user_agent = user_agent
+        self._runner: Optional[web.AppRunner] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._asset_versions: Dict[str, str] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._runner is not None
+
+    async def start(self):
+        """启动服务器，失败时保持未运行状态，渲染会回退到 base64 内联。"""
+        if self._runner:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._prune_cache()
+        app = web.Application()
+        app.router.add_get("/assets/{name}", self._handle_asset)
+        app.router.add_get("/img/{key}", self._handle_image)
+        runner = web.AppRunner(app, access_log=None)
+        try:
+            await runner.setup()
+            site = web.TCPSite(runner, self.host, self.port)
+            await site.start()
+        except Exception as e:
+            logger.error(f"本地资源服务器启动失败 ({self.host}:{self.port}): {e}")
+            await runner.cleanup()
+            return
+        self._runner = runner
+        logger.info(f"本地资源服务器已启动: {self.public_url}")
+
+    async def stop(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def asset_url(self, path: str) -> Optional[str]:
+        """
+        获取 assets 目录下文件的 URL，附带内容哈希以保证长缓存下的更新可见。
+        服务器未运行或文件不在 assets 目录时返回 None。
+        """
+        if not self.running:
+            return None
+        name = os.path.basename(path)
+        if os.path.abspath(os.path.join(ASSETS_DIR, name)) != os.path.abspath(path):
+            return None
+        version = self._asset_versions.get(name)
+        if version is None:
+            try:
+                with open(path, "rb") as f:
+                    version = hashlib.sha1(f.read()).hexdigest()[:12]
+            except OSError:
+                return None
+            self._asset_versions[name] = version
+        return f"{self.public_url}/assets/{quote(name)}?v={version}"
+
+    def image_url(self, url: str) -> str:
+        """将 B 站图片地址转换为本地代理地址，无法代理时原样返回。"""
+        if not self.running or not url or not _is_proxyable(url):
+            return url
+        if url.startswith("//"):
+            url = f"https:{url}"
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        ext = os.path.splitext(urlparse(url).path)[1].lower() or ".img"
+        return f"{self.public_url}/img/{key}{ext}?u={quote(url, safe='')}"
+
+    async def _handle_asset(self, request: web.Request) -> web.StreamResponse:
+        name = request.match_info["name"]
+        path = os.path.join(ASSETS_DIR, name)
+        if (
+            os.path.dirname(os.path.abspath(path)) != os.path.abspath(ASSETS_DIR)
+            or not os.path.isfile(path)
+        ):
+            raise web.HTTPNotFound()
+        return web.FileResponse(path, headers=_cache_headers())
+
+    async def _handle_image(self, request: web.Request) -> web.StreamResponse:
+        key = request.match_info["key"]
+        url = request.query.get("u", "")
+        if not url or not _is_proxyable(url):
+            raise web.HTTPForbidden()
+        digest = os.path.splitext(key)[0]
+        if digest != hashlib.sha1(url.encode("utf-8")).hexdigest():
+            raise web.HTTPBadRequest()
+
+        path = os.path.join(self.cache_dir, key)
+        if not os.path.isfile(path):
+            content = await self._fetch(url)
+            if content is None:
+                raise web.HTTPBadGateway()
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+        content_type = mimetypes.guess_type(url.split("?", 1)[0])[0]
+        headers = _cache_headers()
+        if content_type:
+            headers["Content-Type"] = content_type
+        return web.FileResponse(path, headers=headers)
+
+    async def _fetch(self, url: str) -> Optional[bytes]:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=15)
+            )
+        headers = {"Referer": "https://www.bilibili.com/"}
+        if self.user_agent:
+            headers["User-Agent"] = self.user_agent
+        try:
+            async with self._session.get(url, headers=headers) as resp:
+                if resp.status != 200:
+                    logger.warning(f"代理图片失败 (HTTP {resp.status}): {url}")
+                    return None
+                return await resp.read()
+        except Exception as e:
+            logger.warning(f"代理图片失败: {url}: {e}")
+            return None
+
+    def _prune_cache(self):
+        """清理过期的图片缓存文件。"""
+        expire_before = time.time() - IMAGE_CACHE_EXPIRE_DAYS * 86400
+        try:
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and entry.stat().st_mtime < expire_before:
+                    os.remove(entry.path)
+        except OSError as e:
+            logger.warning(f"清理图片缓存失败: {e}")
+
+
+def _is_proxyable(url: str) -> bool:
+    host = urlparse(f"https:{url}" if url.startswith("//") else url).hostname or ""
+    return any(host == h or host.endswith(f".{h}") for h in IMAGE_PROXY_HOSTS)
+
+
+def _cache_headers() -> Dict[str, str]:
+    return {"Cache-Control": f"public, max-age={ASSET_CACHE_MAX_AGE}, immutable"}
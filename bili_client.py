@@ -1,12 +1,50 @@
+import os
+import json
+import time
 import aiohttp
 import asyncio
 from astrbot.api import logger
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 import aiohttp
 import asyncio
 from astrbot.api import logger
-from bilibili_api import user, Credential, video
+from bilibili_api import user, video, live
 from bilibili_api.utils.network import Api
+from bilibili_api.exceptions import ResponseCodeException, NetworkException
+from .cache import TTLCache, SingleFlight
+from .credential_pool import (
+    CredentialPool,
+    CredentialSlot,
+    build_credential,
+    parse_cookie_entry,
+    RISK_HTTP_STATUS,
+    RISK_RESPONSE_CODE,
+)
+from .proxy_pool import ProxyPool, ProxyEndpoint
+from .models import Author, trim_feed, trim_video_list
+from .utils import json_loads
+from .metrics import metrics
+from .constant import (
+    FEED_CACHE_TTL,
+    FEED_CACHE_SIZE,
+    HTTP_POOL_SIZE,
+    HTTP_POOL_PER_HOST,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_TIMEOUT,
+    B23_TIMEOUT,
+    B23_CACHE_SIZE,
+    VIDEO_CACHE_TTL,
+    VIDEO_CACHE_SIZE,
+    VIDEO_BATCH_CONCURRENCY,
+    VIDEO_LIST_PAGE_SIZE,
+    USER_CACHE_TTL,
+    USER_CACHE_SIZE,
+    PROFILE_BATCH_SIZE,
+    PROFILE_BATCH_CONCURRENCY,
+    LIVE_BATCH_SIZE,
+    LIVE_BATCH_CONCURRENCY,
+)
 
 # 尝试兼容不同版本的 settings 导入
 try:
@@ -18,6 +56,50 @@ except ImportError:
     except ImportError:
         settings = None
 
+try:
+    from bilibili_api.utils import network as bili_network
+except ImportError:
+    bili_network = None
+
+DEFAULT_HEADERS = dict(getattr(bili_network, "HEADERS", {}) or {})
+
+
+# 与 bilibili_api 中 User.get_dynamics_new 一致的接口配置与参数
+DYNAMIC_FEED_API = {
+    "url": "https://api.bilibili.com/x/polymer/web-dynamic/v1/feed/space",
+    "method": "GET",
+    "verify": False,
+    "wbi": True,
+    "dm": True,
+    "params": {"host_mid": "int: uid", "offset": "str: 动态偏移"},
+    "comment": "用户动态信息",
+}
+# 与 bilibili_api 中 User.get_videos 一致的接口配置
+VIDEO_LIST_API = {
+    "url": "https://api.bilibili.com/x/space/wbi/arc/search",
+    "method": "GET",
+    "verify": False,
+    "wbi": True,
+    "dm": True,
+    "params": {"mid": "int: uid", "ps": "int: 每页数量", "pn": "int: 页码"},
+    "comment": "用户投稿视频列表",
+}
+LIVE_STATUS_API = {
+    "url": "https://api.live.bilibili.com/room/v1/Room/get_status_info_by_uids",
+    "method": "GET",
+    "verify": False,
+    "params": {"uids[]": "list<int>: 主播uid列表"},
+    "comment": "通过主播uid列表获取直播间状态信息（是否在直播、房间号等）",
+}
+USER_CARDS_API = {
+    "url": "https://api.vc.bilibili.com/account/v1/user/cards",
+    "method": "GET",
+    "verify": False,
+    "params": {"uids": "str: 以逗号分隔的 uid 列表，最多 50 个"},
+    "comment": "批量获取用户名片（昵称、头像）",
+}
+DYNAMIC_FEED_FEATURES = "itemOpusStyle,listOnlyfans,opusBigCover,onlyfansVote,forwardListHidden,decorationCard,commentsNewVersion,onlyfansAssetsV2,ugcDelete,onlyfansQaCard"
+
 
 class BiliClient:
     """
@@ -30,9 +112,17 @@ class BiliClient:
         bili_jct: Optional[str] = None,
         buvid3: Optional[str] = None,
         user_agent: Optional[str] = None,
+        cache_path: Optional[str] = None,
+        extra_credentials: Optional[List[str]] = None,
+        proxies: Optional[List[str]] = None,
+        proxy_rate: float = 1.0,
     ):
         """
         初始化 Bilibili API 客户端。
+        cache_path 不为空时，短链与用户信息缓存会在启动时读取、关闭时写回该文件。
+        extra_credentials 为额外账号的 Cookie 字符串，与主账号一起组成凭证池轮流用于轮询请求。
+        proxies 为 HTTP/SOCKS 代理地址列表，配置后轮询请求按 UID 分配到各代理出口，
+        每个出口每秒最多 proxy_rate 个请求。
         """
         # 如果主人没填，默认模拟火狐浏览器
         self.user_agent = user_agent or "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/115.0"
@@ -47,48 +137,407 @@ class BiliClient:
                 "Accept-Language": "zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2",
             })
         
-        self.credential = None
-        if sessdata:
-            # 填入尽可能完整的凭证
-            self.credential = Credential(
-                sessdata=sessdata, 
-                bili_jct=bili_jct, 
-                buvid3=buvid3,
-                # 有些版本支持 buvid4，咱们也尝试从 buvid3 派生一个（或者如果有的话）
-                buvid4=f"{buvid3}infoc" if buvid3 else None 
-            )
-        else:
+        self.credential = build_credential(sessdata, bili_jct, buvid3)
+        if not self.credential:
             logger.warning("未提供 SESSDATA，部分需要登录的API可能无法使用。")
 
+        slots = [CredentialSlot("主账号", self.credential, self.user_agent)]
+        for idx, entry in enumerate(extra_credentials or []):
+            fields = parse_cookie_entry(entry)
+            credential = build_credential(
+                fields.get("SESSDATA"),
+                fields.get("bili_jct"),
+                fields.get("buvid3"),
+                fields.get("DedeUserID"),
+            )
+            if not credential:
+                logger.warning(f"凭证池第 {idx + 1} 项缺少 SESSDATA，已忽略")
+                continue
+            slots.append(
+                CredentialSlot(
+                    f"账号{idx + 2}", credential, fields["user_agent"] or self.user_agent
+                )
+            )
+        self.credentials = CredentialPool(slots)
+        if len(slots) > 1:
+            logger.info(f"凭证池已加载 {len(slots)} 个账号")
+
+        self.proxies: Optional[ProxyPool] = None
+        if proxies:
+            self.proxies = ProxyPool(proxies, rate=proxy_rate)
+            if self.proxies:
+                logger.info(f"代理池已加载 {len(self.proxies)} 个出口")
+            else:
+                self.proxies = None
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._feed_cache: TTLCache[Dict[str, Any]] = TTLCache(
+            maxsize=FEED_CACHE_SIZE, ttl=FEED_CACHE_TTL
+        )
+        # b23 短链解析结果不会变化，永久缓存；视频数据变化快，仅短时缓存
+        self._b23_cache: TTLCache[str] = TTLCache(maxsize=B23_CACHE_SIZE)
+        self._video_cache: TTLCache[Dict[str, Any]] = TTLCache(
+            maxsize=VIDEO_CACHE_SIZE, ttl=VIDEO_CACHE_TTL
+        )
+        self._user_cache: TTLCache[Dict[str, Any]] = TTLCache(
+            maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL
+        )
+        # UP 主昵称与头像，由批量名片接口、用户信息与动态作者信息共同填充
+        self._profile_cache: TTLCache[Dict[str, Any]] = TTLCache(
+            maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL
+        )
+        # 相同请求并发时只发出一次
+        self._flight = SingleFlight()
+        self.cache_path = cache_path
+        self._load_caches()
+        metrics.register_gauge("api_cache", self._cache_stats)
+
+    def _cache_stats(self) -> Dict[str, Any]:
+        caches = {
+            "feed": self._feed_cache,
+            "video": self._video_cache,
+            "user": self._user_cache,
+            "profile": self._profile_cache,
+            "b23": self._b23_cache,
+        }
+        stats = {
+            name: f"{cache.stats()['hit_ratio']:.0%}({len(cache)})"
+            for name, cache in caches.items()
+        }
+        stats["shared"] = self._flight.shared
+        return stats
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        获取插件共享的 HTTP 会话，首次调用时在当前事件循环中创建。
+        连接池开启 keep-alive 与 DNS 缓存，同一主机的请求复用 TCP/TLS 连接。
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_SIZE,
+                limit_per_host=HTTP_POOL_PER_HOST,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+                # 凭证由各请求自行携带，不在会话中累积 Cookie
+                cookie_jar=aiohttp.DummyCookieJar(),
+                headers={
+                    "User-Agent": self.user_agent,
+                    "Referer": "https://www.bilibili.com/",
+                    "Accept-Encoding": "gzip, deflate, br",
+                },
+            )
+            await self._bind_library_session(self._session)
+        return self._session
+
+    @staticmethod
+    async def _bind_library_session(session: aiohttp.ClientSession):
+        """
+        bilibili_api 使用 aiohttp 客户端时，让其复用同一个会话。
+        选用 curl_cffi 等其他客户端时保持不变，它们各自维护按事件循环复用的会话。
+        """
+        if bili_network is None or not hasattr(bili_network, "set_session"):
+            return
+        try:
+            if bili_network.get_selected_client()[0] != "aiohttp":
+                return
+            # set_session 要求当前事件循环已有客户端，先取出库默认创建的会话以便关闭
+            previous = bili_network.get_session()
+            bili_network.set_session(session)
+            if previous is not session and not previous.closed:
+                await previous.close()
+        except Exception as e:
+            logger.debug(f"bilibili_api 未能复用共享会话: {e}")
+
+    def _persistent_caches(self) -> Dict[str, TTLCache]:
+        return {
+            "b23": self._b23_cache,
+            "user": self._user_cache,
+            "profile": self._profile_cache,
+        }
+
+    def _load_caches(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for name, cache in self._persistent_caches().items():
+                cache.load(data.get(name, []))
+        except Exception as e:
+            logger.warning(f"读取 API 缓存失败，将忽略: {e}")
+
+    def save_caches(self):
+        """将短链与用户信息缓存写入 cache_path。"""
+        if not self.cache_path:
+            return
+        data = {name: cache.dump() for name, cache in self._persistent_caches().items()}
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.error(f"保存 API 缓存失败: {e}")
+
+    async def close(self):
+        """保存缓存并关闭共享的 HTTP 会话。"""
+        self.save_caches()
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self.proxies:
+            await self.proxies.close()
+
     async def get_user(self, uid: int) -> user.User:
         """
         根据UID获取一个 User 对象。
         """
+        await self._get_session()
         return user.User(uid=uid, credential=self.credential)
 
-    async def get_video_info(self, bvid: str) -> Optional[Dict[str, Any]]:
+    async def get_video_info(
+        self, bvid: str, with_online: bool = True
+    ) -> Optional[Dict[str, Any]]:
         """
         获取视频的详细信息和在线观看人数。
+        with_online 为 False 时不请求在线人数，返回结果中的 online 为 None。
         """
+        cached = self._video_cache.get((bvid, True))
+        if cached is None and not with_online:
+            cached = self._video_cache.get((bvid, False))
+        if cached is not None:
+            return cached
         try:
-            v = video.Video(bvid=bvid, credential=self.credential)
-            info = await v.get_info()
-            online = await v.get_online()
-            return {"info": info, "online": online}
+            result = await self._flight.do(
+                ("video", bvid, with_online),
+                lambda: self._fetch_video_info(bvid, with_online),
+            )
         except Exception as e:
             logger.error(f"获取视频信息失败 (BVID: {bvid}): {e}")
             return None
+        self._video_cache.set((bvid, with_online), result)
+        return result
 
-    async def get_latest_dynamics(self, uid: int) -> Optional[Dict[str, Any]]:
+    async def _fetch_video_info(self, bvid: str, with_online: bool) -> Dict[str, Any]:
+        await self._get_session()
+        v = video.Video(bvid=bvid, credential=self.credential)
+        if not with_online:
+            return {"info": await v.get_info(), "online": None}
+        info, online = await asyncio.gather(v.get_info(), v.get_online())
+        return {"info": info, "online": online}
+
+    async def get_videos_info(
+        self, bvids: List[str], with_online: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取多个视频的信息，去重后以有限并发请求。返回 bvid -> 结果，失败的视频不包含在内。
+        """
+        semaphore = asyncio.Semaphore(VIDEO_BATCH_CONCURRENCY)
+
+        async def fetch(bvid: str):
+            async with semaphore:
+                return bvid, await self.get_video_info(bvid, with_online=with_online)
+
+        results = await asyncio.gather(*(fetch(b) for b in dict.fromkeys(bvids)))
+        return {bvid: data for bvid, data in results if data}
+
+    async def get_latest_dynamics(
+        self, uid: int, raise_errors: bool = False
+    ) -> Optional[Dict[str, Any]]:
         """
-        获取用户的最新动态。
+        获取用户的最新动态。返回精简后的动态列表（仅保留插件用到的字段），按 UID 短时缓存。
+        raise_errors 为 True 时异常直接抛出，由调用方记录与处理。
         """
+        uid = int(uid)
+        cached = self._feed_cache.get(uid)
+        if cached is not None:
+            return cached
         try:
-            u = await self.get_user(uid)
-            return await u.get_dynamics_new()
+            feed = await self._flight.do(
+                ("feed", uid), lambda: self._fetch_dynamics_page(uid)
+            )
         except Exception as e:
+            if raise_errors:
+                raise
             logger.error(f"获取用户动态失败 (UID: {uid}): {e}")
             return None
+        self._feed_cache.set(uid, feed)
+        return feed
+
+    async def _fetch_dynamics_page(self, uid: int, offset: str = "") -> Dict[str, Any]:
+        """获取一页动态并裁剪掉插件不需要的字段。"""
+        params = {
+            "host_mid": uid,
+            "offset": offset,
+            "features": DYNAMIC_FEED_FEATURES,
+            "timezone_offset": -480,
+            "x-bili-device-req-json": '{"platform":"web","device":"pc"}',
+            "x-bili-web-req-json": '{"spm_id":"333.1387"}',
+        }
+        return trim_feed(
+            await self._pooled_request(DYNAMIC_FEED_API, params, route_key=uid)
+        )
+
+    async def _pooled_request(
+        self,
+        api_config: Dict[str, Any],
+        params: Dict[str, Any],
+        no_csrf: bool = False,
+        route_key: Any = None,
+    ) -> Any:
+        """
+        从凭证池取一个账号（连同其 User-Agent）发起请求，返回 data 字段。
+        配置了代理池时按 route_key 选择代理出口。
+        触发风控时隔离该账号，异常继续向上抛出。
+        """
+        await self._get_session()
+        slot = self.credentials.acquire()
+        api = Api(**api_config, no_csrf=no_csrf, credential=slot.credential)
+        api.update_params(**params)
+        api.update_headers(**{**DEFAULT_HEADERS, "User-Agent": slot.user_agent})
+        name = f"api.{api_config['url'].rsplit('/', 1)[-1]}"
+        start, ok = time.perf_counter(), False
+        try:
+            endpoint = None
+            if self.proxies:
+                endpoint = self.proxies.select(
+                    route_key if route_key is not None else api_config["url"]
+                )
+            data = await self._request_data(api, endpoint)
+            ok = True
+        except ResponseCodeException as e:
+            metrics.inc(f"api.error.{e.code}")
+            if e.code == RISK_RESPONSE_CODE:
+                self.credentials.report_risk(slot)
+            raise
+        except NetworkException as e:
+            metrics.inc(f"api.error.{e.status}")
+            if e.status == RISK_HTTP_STATUS:
+                self.credentials.report_risk(slot)
+            raise
+        finally:
+            metrics.observe(name, time.perf_counter() - start)
+            metrics.inc(f"{name}.ok" if ok else f"{name}.fail")
+        self.credentials.report_success(slot)
+        return data
+
+    async def _request_data(
+        self, api: Api, endpoint: Optional[ProxyEndpoint] = None
+    ) -> Any:
+        """
+        由 bilibili_api 完成签名与 Cookie 组装后发出请求，检查 HTTP 状态码，
+        再直接用 json_loads 解析响应字节，随后由调用方裁剪，
+        避免完整的响应字典在解析与渲染期间一直驻留内存。
+        wbi 签名的接口返回 -403 时与库的处理一致：重新计算 mixin key 后重试。
+        """
+        if endpoint is None and not hasattr(bili_network, "get_client"):
+            # 旧版本 bilibili_api 没有可替换的请求客户端，交给库自带的请求与解析
+            return await api.request()
+        retry_times = max(1, bili_network.request_settings.get_wbi_retry_times())
+        for attempt in range(retry_times):
+            config = await api._prepare_request()
+            if endpoint is None:
+                status, raw = await self._send_direct(config)
+            else:
+                status, raw = await self._request_via_proxy(config, endpoint)
+            if not 200 <= status < 300:
+                raise NetworkException(status, api.url)
+            try:
+                return self._decode_response(raw)
+            except ResponseCodeException as e:
+                if e.code != -403 or not api.wbi or attempt == retry_times - 1:
+                    raise
+                bili_network.recalculate_wbi()
+
+    @staticmethod
+    async def _send_direct(config: Dict[str, Any]) -> Tuple[int, bytes]:
+        """经 bilibili_api 选用的请求客户端（aiohttp / curl_cffi 等）发出请求。"""
+        resp = await bili_network.get_client().request(**config)
+        return resp.code, resp.raw
+
+    async def _request_via_proxy(
+        self, config: Dict[str, Any], endpoint: ProxyEndpoint
+    ) -> Tuple[int, bytes]:
+        """
+        经指定代理出口发出请求。连接失败、超时、412 与 5xx 计入该出口的错误率，
+        目标站点的普通 4xx 不归咎于代理。
+        """
+        await endpoint.bucket.acquire()
+        if endpoint.is_socks:
+            session, proxy = await self.proxies.session_for(endpoint), None
+        else:
+            session, proxy = await self._get_session(), endpoint.url
+        start = time.monotonic()
+        try:
+            async with session.request(
+                config["method"],
+                config["url"],
+                params=config["params"],
+                data=config["data"] or None,
+                headers=config["headers"],
+                cookies=config["cookies"],
+                proxy=proxy,
+            ) as resp:
+                status, raw = resp.status, await resp.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.proxies.record(endpoint, time.monotonic() - start, False)
+            raise
+        ok = status < 500 and status != RISK_HTTP_STATUS
+        self.proxies.record(endpoint, time.monotonic() - start, ok)
+        return status, raw
+
+    @staticmethod
+    def _decode_response(raw: bytes) -> Any:
+        resp = json_loads(raw)
+        code = resp.get("code", 0)
+        if code != 0:
+            raise ResponseCodeException(code, resp.get("message", ""), resp)
+        return resp.get("data")
+
+    async def get_latest_videos(
+        self, uid: int, raise_errors: bool = False
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        获取用户最近投稿的视频（按发布时间倒序，已精简字段），与动态列表共用短时缓存。
+        仅关注视频的订阅用它代替完整的动态列表。
+        """
+        uid = int(uid)
+        key = ("videos", uid)
+        cached = self._feed_cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            videos = await self._flight.do(key, lambda: self._fetch_videos(uid))
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.error(f"获取用户投稿视频失败 (UID: {uid}): {e}")
+            return None
+        self._feed_cache.set(key, videos)
+        return videos
+
+    async def _fetch_videos(self, uid: int) -> List[Dict[str, Any]]:
+        u = await self.get_user(uid)
+        params = {
+            "mid": uid,
+            "ps": VIDEO_LIST_PAGE_SIZE,
+            "tid": 0,
+            "pn": 1,
+            "keyword": "",
+            "order": "pubdate",
+            "order_avoided": True,
+            "platform": "web",
+            # access_id 由库按 UP 主缓存，未过期时不会重复请求
+            "w_webid": await u.get_access_id(),
+        }
+        return trim_video_list(
+            await self._pooled_request(VIDEO_LIST_API, params, route_key=uid)
+        )
 
     async def get_live_info(self, uid: int) -> Optional[Dict[str, Any]]:
         """
@@ -103,27 +552,64 @@ class BiliClient:
             return None
 
     async def get_live_info_by_uids(self, uids: list[int]) -> Optional[Dict[str, Any]]:
-        API_CONFIG = {
-            "url": "https://api.live.bilibili.com/room/v1/Room/get_status_info_by_uids",
-            "method": "GET",
-            "verify": False,
-            "params": {"uids[]": "list<int>: 主播uid列表"},
-            "comment": "通过主播uid列表获取直播间状态信息（是否在直播、房间号等）",
-        }
-        params = {"uids[]": uids}
-        resp = await Api(**API_CONFIG, no_csrf=True, credential=self.credential).update_params(**params).result
-        if not isinstance(resp, dict) or not resp:
-            return None
-        live_room = next(iter(resp.values()))
-        return live_room
+        """获取单个 UP 主的直播间信息，批量查询请使用 get_live_rooms。"""
+        rooms = await self.get_live_rooms(uids)
+        return next(iter(rooms.values()), None)
+
+    async def get_live_rooms(self, uids: Iterable[int]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取直播间状态，每 LIVE_BATCH_SIZE 个 UID 合并为一次请求，并限制并发。
+        返回 uid -> 直播间信息，从未开通直播间的 UID 不包含在内。
+        """
+        uids = list(dict.fromkeys(int(u) for u in uids))
+        semaphore = asyncio.Semaphore(LIVE_BATCH_CONCURRENCY)
+        chunks = [
+            uids[i : i + LIVE_BATCH_SIZE] for i in range(0, len(uids), LIVE_BATCH_SIZE)
+        ]
+
+        async def fetch(chunk: List[int]) -> Dict[str, Any]:
+            async with semaphore:
+                resp = await self._flight.do(
+                    ("live", tuple(chunk)),
+                    lambda: self._pooled_request(
+                        LIVE_STATUS_API, {"uids[]": chunk}, no_csrf=True, route_key=chunk[0]
+                    ),
+                )
+            return resp if isinstance(resp, dict) else {}
+
+        rooms: Dict[str, Dict[str, Any]] = {}
+        for resp in await asyncio.gather(*(fetch(chunk) for chunk in chunks)):
+            rooms.update((str(uid), room) for uid, room in resp.items())
+        return rooms
+
+    async def get_danmu_server(self, room_id: int) -> Tuple[str, List[str]]:
+        """获取直播间弹幕服务器的鉴权 token 与 websocket 地址列表。"""
+        info = await live.LiveRoom(room_id, credential=self.credential).get_danmu_info()
+        hosts = [
+            f"wss://{h['host']}:{h['wss_port']}/sub"
+            for h in info.get("host_list") or []
+            if h.get("host")
+        ]
+        return info.get("token", ""), hosts
+
+    async def ws_connect(self, url: str) -> aiohttp.ClientWebSocketResponse:
+        """通过共享会话建立 websocket 连接，心跳由调用方按协议自行发送。"""
+        session = await self._get_session()
+        return await session.ws_connect(url, autoping=True, max_msg_size=0)
 
     async def get_user_info(self, uid: int) -> Optional[Tuple[Dict[str, Any], str]]:
         """
         获取用户的基本信息。
         """
+        uid = int(uid)
+        cached = self._user_cache.get(uid)
+        if cached is not None:
+            return cached, ""
         try:
             u = await self.get_user(uid)
-            info = await u.get_user_info()
+            info = await self._flight.do(("user", uid), u.get_user_info)
+            self._user_cache.set(uid, info)
+            self._remember_profile(uid, info.get("name", ""), info.get("face", ""))
             return info, ""
         except Exception as e:
             if "code" in e.args[0] and e.args[0]["code"] == -404:
@@ -133,24 +619,98 @@ class BiliClient:
                 logger.error(f"获取用户信息失败 (UID: {uid}): {e}")
                 return None, f"获取 UP 主信息失败: {str(e)}"
 
+    def _remember_profile(self, uid: int, name: str, face: str):
+        if uid and name:
+            self._profile_cache.set(int(uid), {"mid": int(uid), "name": name, "face": face})
+
+    def remember_profiles(self, authors: Iterable[Author]):
+        """用动态中的作者信息刷新名片缓存，无需额外请求。"""
+        for author in authors:
+            if author.mid:
+                self._remember_profile(author.mid, author.name, author.face)
+
+    def get_cached_profile(self, uid: int) -> Optional[Dict[str, Any]]:
+        return self._profile_cache.get(int(uid))
+
+    async def get_profiles(self, uids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        批量获取 UP 主名片（mid、name、face）。优先使用缓存，
+        未命中的 UID 每 PROFILE_BATCH_SIZE 个合并为一次请求，并限制并发。
+        返回 uid -> 名片，获取失败的 UID 不包含在内。
+        """
+        profiles: Dict[int, Dict[str, Any]] = {}
+        missing: List[int] = []
+        for uid in dict.fromkeys(int(u) for u in uids):
+            cached = self._profile_cache.get(uid)
+            if cached is not None:
+                profiles[uid] = cached
+            else:
+                missing.append(uid)
+        if not missing:
+            return profiles
+
+        semaphore = asyncio.Semaphore(PROFILE_BATCH_CONCURRENCY)
+        chunks = [
+            missing[i : i + PROFILE_BATCH_SIZE]
+            for i in range(0, len(missing), PROFILE_BATCH_SIZE)
+        ]
+
+        async def fetch(chunk: List[int]):
+            async with semaphore:
+                try:
+                    cards = await self._flight.do(
+                        ("cards", tuple(chunk)), lambda: self._fetch_user_cards(chunk)
+                    )
+                except Exception as e:
+                    logger.warning(f"批量获取 UP 主名片失败，改为逐个获取: {e}")
+                    cards = []
+                    for uid in chunk:
+                        info, _ = await self.get_user_info(uid)
+                        if info:
+                            cards.append(info)
+                for card in cards:
+                    self._remember_profile(
+                        card.get("mid", 0), card.get("name", ""), card.get("face", "")
+                    )
+
+        await asyncio.gather(*(fetch(chunk) for chunk in chunks))
+        for uid in missing:
+            cached = self._profile_cache.get(uid)
+            if cached is not None:
+                profiles[uid] = cached
+        return profiles
+
+    async def _fetch_user_cards(self, uids: List[int]) -> List[Dict[str, Any]]:
+        params = {"uids": ",".join(str(uid) for uid in uids)}
+        resp = await self._pooled_request(USER_CARDS_API, params, no_csrf=True)
+        return resp if isinstance(resp, list) else []
+
     async def b23_to_bv(self, url: str) -> Optional[str]:
         """
         b23短链转换为原始链接
         """
-        headers = {
-            "User-Agent": self.user_agent,
-            "Referer": "https://www.bilibili.com/"
-        }
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(
-                    url=url, headers=headers, allow_redirects=False, timeout=10
-                ) as response:
-                    if 300 <= response.status < 400:
-                        location_url = response.headers.get("Location")
-                        if location_url:
-                            base_url = location_url.split("?", 1)[0]
-                            return base_url
-            except Exception as e:
-                logger.error(f"解析b23链接失败 (URL: {url}): {e}")
-                return url
+        cached = self._b23_cache.get(url)
+        if cached is not None:
+            return cached
+        try:
+            base_url = await self._flight.do(("b23", url), lambda: self._resolve_b23(url))
+        except Exception as e:
+            logger.error(f"解析b23链接失败 (URL: {url}): {e}")
+            return url
+        if base_url:
+            self._b23_cache.set(url, base_url)
+        return base_url
+
+    async def _resolve_b23(self, url: str) -> Optional[str]:
+        session = await self._get_session()
+        with metrics.timer("api.b23"):
+            async with session.get(
+                url=url,
+                allow_redirects=False,
+                timeout=aiohttp.ClientTimeout(total=B23_TIMEOUT),
+            ) as response:
+                if 300 <= response.status < 400:
+                    location_url = response.headers.get("Location")
+                    if location_url:
+                        return location_url.split("?", 1)[0]
+        return None
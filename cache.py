@@ -0,0 +1,118 @@
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[V]):
+    """
+    带过期时间的 LRU 缓存。超过 maxsize 时淘汰最久未使用的条目。
+    ttl 为 None 时条目永不过期（仍受 maxsize 约束）。
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        value, expire_at = entry
+        if expire_at is not None and expire_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expire_at = time.monotonic() + ttl if ttl is not None else None
+        self._store(key, value, expire_at)
+
+    def _store(self, key: Hashable, value: V, expire_at: Optional[float]):
+        self._data[key] = (value, expire_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+    def dump(self) -> List[list]:
+        """导出未过期的条目为 [key, value, 过期时间戳或 None] 列表，便于 JSON 持久化。"""
+        now, wall = time.monotonic(), time.time()
+        entries = []
+        for key, (value, expire_at) in self._data.items():
+            if expire_at is None:
+                entries.append([key, value, None])
+            elif expire_at > now:
+                entries.append([key, value, wall + expire_at - now])
+        return entries
+
+    def load(self, entries: List[list]):
+        """导入 dump 导出的条目，跳过已过期的条目并保留原有顺序。"""
+        now, wall = time.monotonic(), time.time()
+        for key, value, expire_ts in entries:
+            if expire_ts is None:
+                self._store(key, value, None)
+            elif expire_ts > wall:
+                self._store(key, value, now + expire_ts - wall)
+
+
+class SingleFlight:
+    """
+    合并相同 key 的并发请求：同一时刻只执行一次，其余调用者等待同一结果，
+    异常同样传递给所有调用者。完成后立即移除，不做任何缓存。
+    请求在独立任务中执行，单个调用者被取消不会影响其他等待者。
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, "asyncio.Task"] = {}
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[V]]) -> V:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: "asyncio.Task"):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # 所有等待者都已取消时避免 "exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
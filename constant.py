@@ -13,6 +13,8 @@ LOGO_PATH = _asset_path("Astrbot.png")
 BANNER_PATH = _asset_path("banner.png")
 BV = r"(?:\?.*)?(?:https?:\/\/)?(?:www\.)?(?:bilibili\.com\/video\/(BV[a-zA-Z0-9]+)|b23\.tv\/([a-zA-Z0-9]+))\/?(?:\?.*)?|BV[a-zA-Z0-9]+"
 VALID_FILTER_TYPES = {"forward", "lottery", "video", "article", "draw", "live"}
+# 需要拉取动态列表才能获得的内容类型（lottery 属于图文的子集）
+CONTENT_FILTER_TYPES = {"forward", "video", "article", "draw"}
 DATA_PATH = "data/astrbot_plugin_bilibili.json"
 DEFAULT_CFG = {
     "bili_sub_list": {}  # sub_user -> [{"uid": "uid", "last": "last_dynamic_id", ...}]
@@ -59,8 +61,119 @@ def get_template_names() -> list:
 
 
 MAX_ATTEMPTS = 3
-RETRY_DELAY = 2
+RETRY_DELAY = 1
+RETRY_MAX_DELAY = 4
+# 渲染服务熔断
+RENDER_BREAKER_THRESHOLD = 5
+RENDER_BREAKER_COOLDOWN = 60
+RENDER_BREAKER_MAX_COOLDOWN = 900
+# 后台渲染任务最长排队时间（秒），超时降级为纯文本
+RENDER_BACKGROUND_TIMEOUT = 120
 RECENT_DYNAMIC_CACHE = 4
+# 精简后的动态列表按 UID 缓存，TTL 需小于轮询间隔，仅用于合并同一轮内的重复请求
+FEED_CACHE_TTL = 30
+FEED_CACHE_SIZE = 4096
+
+# 共享 HTTP 连接池
+HTTP_POOL_SIZE = 32
+HTTP_POOL_PER_HOST = 8
+HTTP_DNS_CACHE_TTL = 300
+HTTP_KEEPALIVE_TIMEOUT = 30
+HTTP_TIMEOUT = 15
+B23_TIMEOUT = 10
+
+# 接口结果缓存（秒）
+B23_CACHE_SIZE = 4096
+VIDEO_CACHE_TTL = 120
+VIDEO_CACHE_SIZE = 512
+VIDEO_BATCH_CONCURRENCY = 4
+# 仅关注视频的订阅拉取的投稿列表长度
+VIDEO_LIST_PAGE_SIZE = 10
+USER_CACHE_TTL = 6 * 3600
+USER_CACHE_SIZE = 2048
+# 批量名片接口单次最多 50 个 UID
+PROFILE_BATCH_SIZE = 50
+PROFILE_BATCH_CONCURRENCY = 2
+# 直播状态批量接口单次查询的 UID 数
+LIVE_BATCH_SIZE = 100
+LIVE_BATCH_CONCURRENCY = 2
+
+# 凭证池：触发风控的账号隔离时间（秒），连续触发时加倍
+CREDENTIAL_QUARANTINE = 600
+CREDENTIAL_MAX_QUARANTINE = 6 * 3600
+
+# 代理池：错误率（指数加权）超过阈值的出口暂停使用，连续被剔除时暂停时间加倍
+PROXY_EWMA_ALPHA = 0.2
+PROXY_EJECT_ERROR_RATE = 0.5
+PROXY_MIN_SAMPLES = 5
+PROXY_EJECT_TIME = 120
+PROXY_MAX_EJECT_TIME = 1800
+PROXY_BURST = 5
+
+# 失败 UP 主的退避与隔离（秒）
+UID_BACKOFF_BASE = 600
+UID_BACKOFF_MAX = 6 * 3600
+UID_QUARANTINE_THRESHOLD = 5
+UID_QUARANTINE_TIME = 6 * 3600
+UID_QUARANTINE_MAX_TIME = 3 * 24 * 3600
+# 同一 UP 主在其他 UP 主正常时连续出现请求类错误（如持续 -403）达到该次数后，计入该 UP 主的失败
+UID_REQUEST_ERROR_LIMIT = 3
+
+# 网络、签名与风控等与 UP 主无关的错误：整体暂停轮询的退避时长（秒）
+POLL_BACKOFF_BASE = 60
+POLL_BACKOFF_MAX = 1800
+
+# 推送连续失败达到次数上限、且首末次失败间隔超过该时长（秒）才暂停会话，避免短暂故障误判
+DELIVERY_SUSPEND_MIN_SPAN = 3600
+# 推送异常中表示会话已不可达（退群、被拉黑、频道不存在等）的关键字，只有这类异常计入连续失败
+PERMANENT_DELIVERY_ERRORS = (
+    "群不存在",
+    "不在群",
+    "不是群成员",
+    "已被移出",
+    "好友不存在",
+    "不是好友",
+    "not a member",
+    "chat not found",
+    "bot was kicked",
+    "bot was blocked",
+    "unknown channel",
+    "missing access",
+    "missing permissions",
+)
+
+# 直播间长连接：每个任务复用的连接数、心跳间隔、无数据判定断线的时长与重连退避（秒）
+LIVE_WS_ROOMS_PER_WORKER = 16
+LIVE_WS_HEARTBEAT = 30
+LIVE_WS_IDLE_TIMEOUT = 75
+LIVE_WS_RECONNECT_BASE = 5
+LIVE_WS_RECONNECT_MAX = 300
+
+# 渲染结果后处理
+MAX_IMAGE_HEIGHT = 25000
+SLICE_HEIGHT = 4000
+SLICE_SEARCH_RANGE = 400
+IMAGE_BYTE_BUDGET = 5 * 1024 * 1024
+JPEG_QUALITY_STEPS = (90, 80, 70, 60)
+
+# 批量渲染：一次渲染的卡片数达到下限时合并为一页，并以色带分隔后切回
+BATCH_RENDER_MIN = 3
+BATCH_RENDER_MAX = 8
+BATCH_SEP_COLORS = ((0, 255, 0), (255, 0, 255))
+
+# 汇总推送：检查到期的间隔（秒）与单条汇总消息最多包含的内容数
+DIGEST_TICK = 30
+DIGEST_MAX_ITEMS = 20
+
+# 推送限速：会话与平台令牌桶的突发容量，会话排队消息超过该数量时合并为一条
+SEND_SESSION_BURST = 3
+SEND_PLATFORM_BURST = 10
+SEND_COLLAPSE_THRESHOLD = 5
+
+# 本地资源服务器
+ASSET_CACHE_MAX_AGE = 365 * 24 * 3600
+IMAGE_CACHE_EXPIRE_DAYS = 7
+IMAGE_PROXY_HOSTS = ("hdslb.com", "biliimg.com", "bilibili.com")
 
 category_mapping = {
     "全部": "ALL",
@@ -0,0 +1,118 @@
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from astrbot.api import logger
+from bilibili_api import Credential
+from .constant import CREDENTIAL_QUARANTINE, CREDENTIAL_MAX_QUARANTINE
+
+# 触发风控的响应：HTTP 412 与接口返回码 -352
+RISK_HTTP_STATUS = 412
+RISK_RESPONSE_CODE = -352
+
+
+def build_credential(
+    sessdata: Optional[str] = None,
+    bili_jct: Optional[str] = None,
+    buvid3: Optional[str] = None,
+    dedeuserid: Optional[str] = None,
+) -> Optional[Credential]:
+    """根据 Cookie 字段构造 Credential，未提供 SESSDATA 时返回 None（游客）。"""
+    if not sessdata:
+        return None
+    return Credential(
+        sessdata=sessdata,
+        bili_jct=bili_jct,
+        buvid3=buvid3,
+        # 有些版本支持 buvid4，咱们也尝试从 buvid3 派生一个（或者如果有的话）
+        buvid4=f"{buvid3}infoc" if buvid3 else None,
+        dedeuserid=dedeuserid,
+    )
+
+
+def parse_cookie_entry(entry: str) -> Dict[str, str]:
+    """
+    解析凭证池配置项："SESSDATA=...; bili_jct=...; buvid3=...||User-Agent"。
+    "||" 之后的部分为该账号使用的 User-Agent，可省略。
+    """
+    cookie, _, user_agent = entry.partition("||")
+    fields = {}
+    for part in cookie.split(";"):
+        key, sep, value = part.strip().partition("=")
+        if sep and value:
+            fields[key.strip()] = value.strip()
+    fields["user_agent"] = user_agent.strip()
+    return fields
+
+
+@dataclass
+class CredentialSlot:
+    """凭证池中的一个账号及其使用与健康状态。"""
+
+    label: str
+    credential: Optional[Credential]
+    user_agent: str
+    last_used: float = 0.0
+    quarantined_until: float = 0.0
+    strikes: int = 0
+    total_requests: int = 0
+    total_risk: int = 0
+
+    def available(self, now: float) -> bool:
+        return now >= self.quarantined_until
+
+
+class CredentialPool:
+    """
+    多账号凭证池。每次请求取最久未使用且未被隔离的账号，使请求均匀分摊到各账号；
+    触发风控（412 / -352）的账号会被隔离一段时间，隔离结束后重新参与轮换，
+    再次触发则隔离时间加倍。
+    """
+
+    def __init__(self, slots: List[CredentialSlot]):
+        if not slots:
+            raise ValueError("凭证池至少需要一个账号")
+        self.slots = slots
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def acquire(self) -> CredentialSlot:
+        """取出下一个用于请求的账号。全部被隔离时选择最早解除隔离的账号。"""
+        now = time.monotonic()
+        candidates = [s for s in self.slots if s.available(now)]
+        if candidates:
+            slot = min(candidates, key=lambda s: s.last_used)
+        else:
+            slot = min(self.slots, key=lambda s: s.quarantined_until)
+        slot.last_used = now
+        slot.total_requests += 1
+        return slot
+
+    def report_success(self, slot: CredentialSlot):
+        if slot.strikes:
+            logger.info(f"凭证 {slot.label} 已恢复正常")
+        slot.strikes = 0
+
+    def report_risk(self, slot: CredentialSlot):
+        """账号触发风控，按连续次数指数延长隔离时间。"""
+        slot.strikes += 1
+        slot.total_risk += 1
+        duration = min(
+            CREDENTIAL_MAX_QUARANTINE, CREDENTIAL_QUARANTINE * 2 ** (slot.strikes - 1)
+        )
+        slot.quarantined_until = time.monotonic() + duration
+        logger.warning(f"凭证 {slot.label} 触发风控，隔离 {duration:.0f} 秒")
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "label": s.label,
+                "available": s.available(now),
+                "retry_in": max(0.0, s.quarantined_until - now),
+                "strikes": s.strikes,
+                "requests": s.total_requests,
+                "risk": s.total_risk,
+            }
+            for s in self.slots
+        ]
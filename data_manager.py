@@ -1,5 +1,6 @@
 import json
 import os
+import time
 from typing import Dict, List, Any, Optional
 from astrbot.api import logger
 from .constant import DEFAULT_CFG, DATA_PATH, RECENT_DYNAMIC_CACHE
@@ -96,13 +97,17 @@ class DataManager:
             return True
         return False
 
-    async def update_last_dynamic_id(self, sub_user: str, uid: int, dyn_id: str):
+    async def update_last_dynamic_id(
+        self, sub_user: str, uid: int, dyn_id: str, pub_ts: int = 0
+    ):
         """
-        更新订阅的最新动态ID。
+        更新订阅的最新动态ID，pub_ts 不为 0 时同时推进发布时间水位。
         """
         sub = self.get_subscription(sub_user, uid)
         if sub:
             sub["last"] = dyn_id
+            if pub_ts > (sub.get("last_pub_ts") or 0):
+                sub["last_pub_ts"] = pub_ts
             history = sub.setdefault("recent_ids", [])
             if dyn_id:
                 if dyn_id in history:
@@ -112,6 +117,60 @@ class DataManager:
                     del history[RECENT_DYNAMIC_CACHE:]
             await self.save()
 
+    async def update_pub_watermark(self, sub_user: str, uid: int, ts: int):
+        """
+        更新订阅已推送到的最新发布时间。动态与投稿视频两种来源共用该水位，
+        订阅变化导致来源切换时不会重复推送已推送过的内容。
+        """
+        sub = self.get_subscription(sub_user, uid)
+        if sub:
+            sub["last_pub_ts"] = ts
+            await self.save()
+
+    def get_digest_window(self, sub_user: str) -> int:
+        """
+        获取会话的汇总推送窗口（分钟），0 表示逐条推送。
+        """
+        return self.data.get("digest_sessions", {}).get(sub_user, 0)
+
+    async def set_digest_window(self, sub_user: str, minutes: int):
+        """
+        设置会话的汇总推送窗口，minutes 为 0 时关闭汇总模式。
+        """
+        sessions = self.data.setdefault("digest_sessions", {})
+        if minutes > 0:
+            sessions[sub_user] = minutes
+        else:
+            sessions.pop(sub_user, None)
+        await self.save()
+
+    def get_digest_buffers(self) -> Dict[str, Dict[str, Any]]:
+        """
+        汇总模式下已收集、尚未推送的内容，与订阅数据一同保存，重启后不会丢失。
+        sub_user -> {"since": 开始收集的时间戳, "items": [渲染数据...]}
+        """
+        return self.data.setdefault("digest_buffer", {})
+
+    async def buffer_digest(self, sub_user: str, items: List[Dict[str, Any]]):
+        """
+        将内容追加到会话的汇总缓冲区（从旧到新）。
+        """
+        entry = self.get_digest_buffers().setdefault(
+            sub_user, {"since": int(time.time()), "items": []}
+        )
+        entry["items"].extend(items)
+        await self.save()
+
+    async def pop_digest(self, sub_user: str) -> List[Dict[str, Any]]:
+        """
+        取出并清空会话的汇总缓冲区。
+        """
+        entry = self.get_digest_buffers().pop(sub_user, None)
+        if entry is None:
+            return []
+        await self.save()
+        return entry["items"]
+
     async def update_live_status(self, sub_user: str, uid: int, is_live: bool):
         """
         更新特定订阅的直播状态。
@@ -167,3 +226,62 @@ class DataManager:
 
         msg = "找到多个订阅者: " + ", ".join(candidate)
         return msg
+
+    def get_suspended_sessions(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取因推送持续失败而被暂停的会话。
+        sub_user -> {"subs": [...], "reason": "...", "since": 时间戳}
+        """
+        return self.data.setdefault("suspended_sub_list", {})
+
+    def is_suspended(self, sub_user: str) -> bool:
+        return sub_user in self.data.get("suspended_sub_list", {})
+
+    async def suspend_session(self, sub_user: str, reason: str) -> int:
+        """
+        暂停一个会话：将其订阅移出轮询列表并单独保存，返回被暂停的订阅数。
+        """
+        subs = self.get_all_subscriptions().pop(sub_user, None)
+        if subs is None:
+            return 0
+        self.get_suspended_sessions()[sub_user] = {
+            "subs": subs,
+            "reason": reason,
+            "since": int(time.time()),
+        }
+        await self.save()
+        return len(subs)
+
+    async def restore_session(self, sid: str) -> str:
+        """
+        恢复被暂停的会话。sid 可以是完整的会话标识或其中的会话 ID。
+        """
+        suspended = self.get_suspended_sessions()
+        candidate = [
+            sub_user
+            for sub_user in suspended
+            if sub_user == sid or sub_user.split(":")[-1] == str(sid)
+        ]
+        if not candidate:
+            return "未找到被暂停的会话"
+        if len(candidate) > 1:
+            return "找到多个被暂停的会话: " + ", ".join(candidate)
+
+        sub_user = candidate[0]
+        restored = await self.resume_session(sub_user)
+        return f"已恢复 {sub_user} 的 {restored} 条订阅"
+
+    async def resume_session(self, sub_user: str) -> int:
+        """
+        将被暂停会话的订阅放回轮询列表，返回恢复的订阅数；会话未被暂停时返回 0。
+        同一 UP 主已有订阅时保留现有的一条。
+        """
+        entry = self.get_suspended_sessions().pop(sub_user, None)
+        if entry is None:
+            return 0
+        current = self.get_all_subscriptions().setdefault(sub_user, [])
+        known = {str(sub.get("uid")) for sub in current}
+        restored = [sub for sub in entry["subs"] if str(sub.get("uid")) not in known]
+        current.extend(restored)
+        await self.save()
+        return len(restored)
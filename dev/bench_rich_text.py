@@ -0,0 +1,82 @@
+"""
+富文本渲染基准测试
+对比逐节点 str.replace 的旧实现与单次遍历的 render_rich_text
+在项目根目录运行: python -m dev.bench_rich_text
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+CURRENT_DIR = Path(__file__).parent
+PROJECT_ROOT = CURRENT_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from rich_text import render_rich_text
+
+
+def legacy_parse_rich_text(summary, topic):
+    """旧实现，仅用于对比。"""
+    text = "<br>".join(filter(None, summary["text"].split("\n")))
+    if topic:
+        topic_link = f"<a href='{topic['jump_url']}'># {topic['name']}</a>"
+        text = f"# {topic_link}<br>" + text
+    for node in summary["rich_text_nodes"]:
+        if node["type"] == "RICH_TEXT_NODE_TYPE_EMOJI":
+            emoji_info = node["emoji"]
+            text = text.replace(emoji_info["text"], f"<img src='{emoji_info['icon_url']}'>")
+        elif node["type"] == "RICH_TEXT_NODE_TYPE_TOPIC":
+            topic_info = node["text"]
+            text = text.replace(
+                topic_info, f"<a href='https:{node['jump_url']}'>{topic_info}</a>"
+            )
+    return text
+
+
+def make_summary(paragraphs: int) -> dict:
+    """构造一条包含文本、表情与话题节点的长动态。"""
+    nodes = []
+    for i in range(paragraphs):
+        nodes.append(
+            {"type": "RICH_TEXT_NODE_TYPE_TEXT", "text": f"第{i}段正文，今天也要开心鸭"}
+        )
+        nodes.append(
+            {
+                "type": "RICH_TEXT_NODE_TYPE_EMOJI",
+                "text": f"[表情{i}]",
+                "emoji": {
+                    "text": f"[表情{i}]",
+                    "icon_url": f"https://i0.hdslb.com/bfs/emote/{i}.png",
+                },
+            }
+        )
+        nodes.append(
+            {
+                "type": "RICH_TEXT_NODE_TYPE_TOPIC",
+                "text": f"#话题{i}#",
+                "jump_url": f"//search.bilibili.com/all?keyword=话题{i}",
+            }
+        )
+        nodes.append({"type": "RICH_TEXT_NODE_TYPE_TEXT", "text": "\n"})
+    text = "".join(n["text"] for n in nodes)
+    return {"text": text, "rich_text_nodes": nodes}
+
+
+def main():
+    topic = {"name": "测试话题", "jump_url": "https://www.bilibili.com/v/topic/detail?id=1"}
+    for paragraphs in (5, 50, 500):
+        summary = make_summary(paragraphs)
+        assert legacy_parse_rich_text(summary, topic) == render_rich_text(summary, topic)
+        number = max(1, 2000 // paragraphs)
+        legacy = timeit.timeit(lambda: legacy_parse_rich_text(summary, topic), number=number)
+        current = timeit.timeit(lambda: render_rich_text(summary, topic), number=number)
+        print(
+            f"{len(summary['rich_text_nodes']):>5} 个节点: "
+            f"旧实现 {legacy / number * 1e6:9.1f} us  "
+            f"新实现 {current / number * 1e6:9.1f} us  "
+            f"加速 {legacy / current:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import io
+import os
+import struct
+import asyncio
+from typing import List, Optional, Tuple
+from PIL import Image as PILImage, ImageStat
+from astrbot.api import logger
+from .constant import (
+    MAX_IMAGE_HEIGHT,
+    SLICE_HEIGHT,
+    SLICE_SEARCH_RANGE,
+    IMAGE_BYTE_BUDGET,
+    JPEG_QUALITY_STEPS,
+    BATCH_SEP_COLORS,
+)
+
+
+def read_image_size(path: str) -> Optional[Tuple[int, int]]:
+    """
+    仅读取文件头获取图片宽高，支持 PNG、JPEG、GIF、WebP。无法识别时返回 None。
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(32)
+            if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+                return struct.unpack(">II", head[16:24])
+            if head[:6] in (b"GIF87a", b"GIF89a"):
+                return struct.unpack("<HH", head[6:10])
+            if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+                return _webp_size(head)
+            if head[:2] == b"\xff\xd8":
+                f.seek(2)
+                return _jpeg_size(f)
+    except (OSError, struct.error) as e:
+        logger.warning(f"读取图片尺寸失败 {path}: {e}")
+    return None
+
+
+def _jpeg_size(f) -> Optional[Tuple[int, int]]:
+    # 逐个跳过段，直到遇到 SOFn 帧头
+    while True:
+        byte = f.read(1)
+        while byte and byte != b"\xff":
+            byte = f.read(1)
+        while byte == b"\xff":
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue
+        length = struct.unpack(">H", f.read(2))[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">xHH", f.read(5))
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def _webp_size(head: bytes) -> Optional[Tuple[int, int]]:
+    chunk = head[12:16]
+    if chunk == b"VP8X":
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return width, height
+    if chunk == b"VP8L":
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    return None
+
+
+def find_cut_row(img: PILImage.Image, target: int, search: int = SLICE_SEARCH_RANGE) -> int:
+    """
+    在 target 上方 search 像素范围内寻找最"平坦"的一行作为切分点，
+    尽量落在卡片留白处而非文字或图片中间。
+    """
+    top = max(1, target - search)
+    if target <= top:
+        return target
+    width = img.width
+    # 缩小宽度以加速逐行统计
+    region = img.crop((0, top, width, target)).convert("L")
+    region = region.resize((max(1, width // 8), region.height))
+    best_y, best_score = target, None
+    for y in range(region.height - 1, -1, -1):
+        stat = ImageStat.Stat(region.crop((0, y, region.width, y + 1)))
+        score = stat.var[0]
+        if best_score is None or score < best_score:
+            best_y, best_score = top + y, score
+            if score == 0:
+                break
+    return best_y
+
+
+def slice_image(img: PILImage.Image, slice_height: int = SLICE_HEIGHT) -> List[PILImage.Image]:
+    """将过长的图片在安全的行边界切分为多段。"""
+    parts = []
+    y = 0
+    while img.height - y > slice_height:
+        cut = find_cut_row(img, y + slice_height)
+        parts.append(img.crop((0, y, img.width, cut)))
+        y = cut
+    parts.append(img.crop((0, y, img.width, img.height)))
+    return parts
+
+
+def encode_to_budget(img: PILImage.Image, max_bytes: int = IMAGE_BYTE_BUDGET) -> bytes:
+    """以 JPEG 编码，逐级降低质量直至不超过字节预算，仍超出时按比例缩小尺寸。"""
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    data = b""
+    while True:
+        for quality in JPEG_QUALITY_STEPS:
+            buffer = io.BytesIO()
+            img.save(buffer, format="JPEG", quality=quality, optimize=True)
+            data = buffer.getvalue()
+            if len(data) <= max_bytes:
+                return data
+        if img.width <= 200:
+            return data
+        scale = max(0.5, (max_bytes / len(data)) ** 0.5 * 0.95)
+        img = img.resize(
+            (int(img.width * scale), int(img.height * scale)), PILImage.LANCZOS
+        )
+
+
+def _match_color(pixel, target, tolerance: int = 60) -> bool:
+    return all(abs(a - b) <= tolerance for a, b in zip(pixel, target))
+
+
+def find_batch_separators(img: PILImage.Image) -> List[Tuple[int, int]]:
+    """
+    查找批量渲染页面中卡片之间的分隔条（绿-品红-绿三段色带），返回各分隔条的 (起始行, 结束行)。
+    在三个采样列上同时匹配以避免误判卡片中的图片。
+    """
+    rgb = img if img.mode == "RGB" else img.convert("RGB")
+    columns = [rgb.width // 4, rgb.width // 2, rgb.width * 3 // 4]
+    pixels = rgb.load()
+
+    def row_color(y: int) -> Optional[str]:
+        for name, color in (("g", BATCH_SEP_COLORS[0]), ("m", BATCH_SEP_COLORS[1])):
+            if all(_match_color(pixels[x, y], color) for x in columns):
+                return name
+        return None
+
+    # 将逐行颜色压缩为连续色段
+    runs: List[Tuple[Optional[str], int, int]] = []
+    for y in range(rgb.height):
+        color = row_color(y)
+        if runs and runs[-1][0] == color:
+            runs[-1] = (color, runs[-1][1], y + 1)
+        else:
+            runs.append((color, y, y + 1))
+
+    # JPEG 压缩会在色带交界处产生过渡行，允许相邻色段间有少量未匹配行
+    colored = [r for r in runs if r[0] and 1 <= r[2] - r[1] <= 64]
+    separators = []
+    for i in range(len(colored) - 2):
+        seq = colored[i : i + 3]
+        if [r[0] for r in seq] == ["g", "m", "g"] and all(
+            seq[j + 1][1] - seq[j][2] <= 4 for j in range(2)
+        ):
+            separators.append((seq[0][1], seq[2][2]))
+    return separators
+
+
+def split_batch_image(path: str, count: int) -> Optional[List[str]]:
+    """
+    将批量渲染得到的长图按分隔条切回 count 张卡片。分隔条数量不符时返回 None。
+    """
+    with PILImage.open(path) as img:
+        rgb = img.convert("RGB")
+        separators = find_batch_separators(rgb)
+        if len(separators) != count - 1:
+            logger.warning(
+                f"批量渲染结果中找到 {len(separators)} 个分隔条，期望 {count - 1} 个"
+            )
+            return None
+        bounds = []
+        top = 0
+        for start, end in separators:
+            bounds.append((top, start))
+            top = end
+        bounds.append((top, rgb.height))
+
+        base, _ = os.path.splitext(path)
+        outputs = []
+        for idx, (y0, y1) in enumerate(bounds):
+            out_path = f"{base}_card{idx}.jpg"
+            rgb.crop((0, y0, rgb.width, y1)).save(out_path, format="JPEG", quality=95)
+            outputs.append(out_path)
+    return outputs
+
+
+async def split_batch_render_output(path: str, count: int) -> Optional[List[str]]:
+    """在线程池中切分批量渲染结果。失败时返回 None。"""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(None, split_batch_image, path, count)
+    except Exception as e:
+        logger.error(f"切分批量渲染图片失败 {path}: {e}")
+        return None
+
+
+def optimize_image(
+    path: str,
+    max_height: int = MAX_IMAGE_HEIGHT,
+    slice_height: int = SLICE_HEIGHT,
+    max_bytes: int = IMAGE_BYTE_BUDGET,
+) -> List[str]:
+    """
+    渲染结果后处理：尺寸与体积都在限制内时原样返回；
+    过长时切分为多张，超出字节预算时自适应压缩。返回输出图片路径列表。
+    """
+    size = read_image_size(path)
+    if size and size[1] <= max_height and os.path.getsize(path) <= max_bytes:
+        return [path]
+
+    with PILImage.open(path) as img:
+        img.load()
+        parts = slice_image(img, slice_height) if img.height > max_height else [img]
+        base, _ = os.path.splitext(path)
+        outputs = []
+        for idx, part in enumerate(parts):
+            out_path = f"{base}_{idx}.jpg" if len(parts) > 1 else f"{base}_opt.jpg"
+            with open(out_path, "wb") as f:
+                f.write(encode_to_budget(part, max_bytes))
+            outputs.append(out_path)
+    return outputs
+
+
+async def optimize_render_output(path: str) -> List[str]:
+    """在线程池中执行后处理，避免阻塞事件循环。失败时返回原图。"""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(None, optimize_image, path)
+    except Exception as e:
+        logger.error(f"处理渲染图片失败 {path}: {e}")
+        return [path]
@@ -2,16 +2,44 @@ import re
 import time
 import asyncio
 import traceback
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Set, Tuple, Union
 from astrbot.api import logger
-from astrbot.api.message_components import Image, Plain, Node, File
+from astrbot.api.message_components import Image, Plain, Node
 from astrbot.api.event import MessageEventResult, MessageChain
 from astrbot.api.all import *
 from .data_manager import DataManager
 from .bili_client import BiliClient
 from .renderer import Renderer
-from .utils import create_render_data, image_to_base64, create_qrcode, is_height_valid
-from .constant import LOGO_PATH, BANNER_PATH
+from .models import DynamicType, ParsedDynamic, parse_feed, parse_video
+from .render_scheduler import PRIORITY_INTERACTIVE, PRIORITY_LIVE, PRIORITY_BACKGROUND
+from .utils import create_render_data, create_qrcode
+from .image_pipeline import optimize_render_output
+from .uid_health import (
+    UidFailureTracker,
+    PollBackoff,
+    PERMANENT_ERROR_CODES,
+    is_request_error,
+)
+from .live_monitor import LiveRoomMonitor
+from .live_state import LiveStateTable
+from .send_governor import SendGovernor
+from .metrics import metrics
+from bilibili_api.exceptions import ResponseCodeException
+from .constant import (
+    LOGO_PATH,
+    BANNER_PATH,
+    BATCH_RENDER_MIN,
+    CONTENT_FILTER_TYPES,
+    DELIVERY_SUSPEND_MIN_SPAN,
+    PERMANENT_DELIVERY_ERRORS,
+    DIGEST_TICK,
+    DIGEST_MAX_ITEMS,
+)
+
+# 每个 UP 主的动态数据来源
+SOURCE_FEED = "feed"  # 完整动态列表
+SOURCE_VIDEOS = "videos"  # 仅投稿视频列表
+SOURCE_NONE = "none"  # 只关注直播，不拉取动态
 
 
 class DynamicListener:
@@ -32,14 +60,61 @@ class DynamicListener:
         self.bili_client = bili_client
         self.renderer = renderer
         self.interval_mins = float(cfg.get("interval_mins", 20))
+        self.live_interval_mins = float(cfg.get("live_interval_mins", 1))
         self.rai = cfg.get("rai", True)
         self.node = cfg.get("node", False)
         self.dynamic_limit = cfg.get("dynamic_limit", 5)
+        self.uid_health = UidFailureTracker()
+        self.poll_backoff = PollBackoff()
+        self.delivery_failure_limit = int(cfg.get("delivery_failure_limit", 5))
+        self.admin_sid = cfg.get("admin_notify_sid", "")
+        # sub_user -> (连续失败次数, 首次失败时间)
+        self._delivery_failures: Dict[str, Tuple[int, float]] = {}
+        self.governor = SendGovernor(
+            self._send_now,
+            session_per_min=float(cfg.get("session_send_per_min", 10)),
+            platform_per_min=float(cfg.get("platform_send_per_min", 60)),
+        )
+        self.live_states = LiveStateTable(data_manager)
+        self.live_monitor: Optional[LiveRoomMonitor] = None
+        if cfg.get("live_ws_enable", False):
+            self.live_monitor = LiveRoomMonitor(
+                bili_client,
+                self._on_live_event,
+                max_rooms=int(cfg.get("live_ws_max_rooms", 50)),
+                server_url=cfg.get("live_ws_url", ""),
+            )
+        metrics.register_gauge("send_queue", self.governor.snapshot)
+        metrics.register_gauge("digest", self._digest_stats)
+        if self.live_monitor is not None:
+            metrics.register_gauge("live_ws", self.live_monitor.snapshot)
+
+    def _digest_stats(self) -> Dict[str, int]:
+        buffers = self.data_manager.get_digest_buffers()
+        return {
+            "sessions": len(buffers),
+            "items": sum(len(entry["items"]) for entry in buffers.values()),
+        }
 
     async def start(self):
         """启动后台监听循环。"""
-        logger.info(f"Bilibili 订阅监听器已启动，检查间隔: {self.interval_mins} 分钟")
+        logger.info(
+            f"Bilibili 订阅监听器已启动，动态检查间隔: {self.interval_mins} 分钟，"
+            f"直播检查间隔: {self.live_interval_mins} 分钟"
+        )
+        try:
+            # 直播状态单独轮询，开播通知不会排在动态拉取与渲染之后
+            await asyncio.gather(
+                self._poll_forever(), self._live_forever(), self._digest_forever()
+            )
+        finally:
+            if self.live_monitor is not None:
+                await self.live_monitor.close()
+            await self.governor.close()
+
+    async def _poll_forever(self):
         while True:
+            start = time.perf_counter()
             try:
                 if self.bili_client.credential is None:
                     logger.warning("bilibili sessdata 未设置，将尝试以游客身份获取公开动态")
@@ -49,62 +124,355 @@ class DynamicListener:
                     logger.debug("当前无任何订阅")
                 else:
                     logger.info(f"开始轮询 {len(all_subs)} 个会话的订阅状态...")
+                    if not self.renderer.health.available:
+                        logger.warning(
+                            f"渲染服务处于熔断状态 ({self.renderer.health.snapshot()['retry_in']:.0f} 秒后探测)，本轮将以纯文本推送"
+                        )
                     
-                for sub_user, sub_list in all_subs.items():
-                    for sub_data in sub_list:
-                        try:
-                            await self._check_single_up(sub_user, sub_data)
-                        except Exception as e:
-                            logger.error(
-                                f"处理订阅者 {sub_user} 的 UP主 {sub_data.get('uid', '未知UID')} 时发生未知错误: {e}\n{traceback.format_exc()}"
-                            )
+                # 同一 UP 主的所有订阅合并为一次检查
+                for uid, subscribers in self._group_by_uid(all_subs).items():
+                    if self.poll_backoff.active():
+                        # 等待退避结束后从当前位置继续，避免排在后面的 UP 主每轮都被跳过
+                        logger.info(
+                            f"接口请求出错，{self.poll_backoff.retry_in:.0f} 秒后继续本轮轮询"
+                        )
+                        await asyncio.sleep(self.poll_backoff.retry_in)
+                    if self.uid_health.should_skip(uid):
+                        logger.debug(f"UP 主 {uid} 处于退避或隔离期，本轮跳过")
+                        continue
+                    try:
+                        await self._check_uid(uid, subscribers)
+                        self.uid_health.record_success(uid)
+                        self.poll_backoff.record_success()
+                        metrics.inc("poll.uid.ok")
+                    except Exception as e:
+                        metrics.inc("poll.uid.fail")
+                        if is_request_error(e):
+                            # 网络、签名与风控错误通常与 UP 主无关，整体退避；
+                            # 前一次检查正常而只有该 UP 主反复出错时，才计入该 UP 主
+                            specific = not self.poll_backoff.failures
+                            self.poll_backoff.record_failure(e)
+                            if specific and self.uid_health.record_request_error(uid):
+                                self._record_uid_failure(uid, e)
+                        else:
+                            self._record_uid_failure(uid, e)
             except Exception as e:
                 logger.error(f"轮询主循环发生严重错误: {e}\n{traceback.format_exc()}")
+            metrics.observe("poll.cycle", time.perf_counter() - start)
             
             await asyncio.sleep(60 * self.interval_mins)
 
-    async def _check_single_up(self, sub_user: str, sub_data: Dict[str, Any]):
-        """检查单个订阅的UP主是否有更新。"""
+    async def _live_forever(self):
+        while True:
+            try:
+                with metrics.timer("live.cycle"):
+                    await self._check_live()
+            except Exception as e:
+                logger.error(f"直播状态轮询发生错误: {e}\n{traceback.format_exc()}")
+            await asyncio.sleep(60 * self.live_interval_mins)
+
+    async def _digest_forever(self):
+        while True:
+            await asyncio.sleep(DIGEST_TICK)
+            await self._flush_digests()
+
+    async def _flush_digests(self):
+        """推送收集时间已达到会话汇总窗口的内容。关闭汇总模式后剩余内容立即推送。"""
+        now = time.time()
+        due = [
+            sub_user
+            for sub_user, entry in self.data_manager.get_digest_buffers().items()
+            if now - entry["since"] >= 60 * self.data_manager.get_digest_window(sub_user)
+        ]
+        for sub_user in due:
+            items = await self.data_manager.pop_digest(sub_user)
+            try:
+                await self._send_digest(sub_user, await self.renderer.attach_assets(items))
+            except Exception as e:
+                logger.error(f"向 {sub_user} 推送汇总时发生错误: {e}\n{traceback.format_exc()}")
+
+    async def _check_live(self):
+        """
+        批量查询所有需要直播通知的 UP 主，与直播状态表比较，只在开播 / 下播时通知。
+        已建立长连接的直播间由推送事件处理，不在此查询。
+        """
+        live_groups = {}
+        for uid, subscribers in self._group_by_uid(
+            self.data_manager.get_all_subscriptions()
+        ).items():
+            live_subs = self._live_subscribers(subscribers)
+            if live_subs:
+                live_groups[uid] = live_subs
+        if self.live_monitor is not None:
+            self.live_monitor.retain(live_groups)
+        self.live_states.retain(live_groups)
+        monitor = self.live_monitor
+        uids = [
+            uid for uid in live_groups if monitor is None or not monitor.is_connected(uid)
+        ]
+        rooms = await self.bili_client.get_live_rooms(uids) if uids else {}
+        transitions = []
+        for uid, live_room in rooms.items():
+            live_subs = live_groups.get(uid)
+            if not live_subs:
+                continue
+            if self.live_monitor is not None:
+                self.live_monitor.watch(uid, live_room.get("room_id", 0))
+            self._seed_live_state(uid, live_subs)
+            live = self.live_states.update(uid, live_room)
+            if live is not None:
+                transitions.append((uid, live, live_room))
+        await self.live_states.flush()
+        for uid, live, live_room in transitions:
+            await self._notify_live(uid, live_groups[uid], live_room, live)
+
+    def _record_uid_failure(self, uid: str, error: Exception):
+        """
+        记录 UP 主检查失败。首次失败打印完整堆栈，之后只输出一行日志，隔离期间不再输出。
+        """
+        permanent = (
+            isinstance(error, ResponseCodeException)
+            and error.code in PERMANENT_ERROR_CODES
+        )
+        entry = self.uid_health.record_failure(uid, str(error), permanent=permanent)
+        if entry.quarantined:
+            # 进入隔离时已由 UidFailureTracker 输出警告
+            logger.debug(f"隔离中的 UP 主 {uid} 仍然失败: {error}")
+        elif entry.failures == 1:
+            logger.error(
+                f"处理 UP主 {uid} 的订阅时发生错误: {error}\n{traceback.format_exc()}"
+            )
+        else:
+            logger.warning(f"处理 UP主 {uid} 的订阅再次失败 (第 {entry.failures} 次): {error}")
+
+    @staticmethod
+    def _group_by_uid(
+        all_subs: Dict[str, List[Dict[str, Any]]],
+    ) -> Dict[str, List[Tuple[str, Dict[str, Any]]]]:
+        groups: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        for sub_user, sub_list in all_subs.items():
+            for sub_data in sub_list:
+                uid = sub_data.get("uid")
+                if uid:
+                    groups.setdefault(str(uid), []).append((sub_user, sub_data))
+        return groups
+
+    @staticmethod
+    def _wanted_types(sub_data: Dict[str, Any]) -> Set[str]:
+        """订阅实际需要的动态内容类型。"""
+        return CONTENT_FILTER_TYPES - set(sub_data.get("filter_types", []))
+
+    def _select_source(self, subscribers: List[Tuple[str, Dict[str, Any]]]) -> str:
+        """根据所有订阅者需要的内容类型的并集，选择开销最小的数据来源。"""
+        wanted: Set[str] = set()
+        for _, sub_data in subscribers:
+            wanted |= self._wanted_types(sub_data)
+        if not wanted:
+            return SOURCE_NONE
+        if wanted == {"video"}:
+            return SOURCE_VIDEOS
+        return SOURCE_FEED
+
+    async def _check_uid(self, uid: str, subscribers: List[Tuple[str, Dict[str, Any]]]):
+        """检查一个 UP 主的更新，并分发给所有订阅了该 UP 主的会话。"""
+        source = self._select_source(subscribers)
+        logger.debug(f"正在检查 UP 主 {uid} 的更新 (来源: {source})...")
+
+        if source == SOURCE_FEED:
+            # 立即解析为精简模型，原始响应随后即可释放
+            dynamics = parse_feed(
+                await self.bili_client.get_latest_dynamics(uid, raise_errors=True)
+            )
+            if dynamics:
+                # 顺带刷新名片缓存，订阅列表等指令可直接从内存读取
+                self.bili_client.remember_profiles(
+                    [dynamics[0].author] + [d.orig.author for d in dynamics if d.orig]
+                )
+                for sub_user, sub_data in subscribers:
+                    await self._dispatch_subscriber(
+                        sub_user, sub_data, self._push_new_dynamics(sub_user, sub_data, dynamics)
+                    )
+        elif source == SOURCE_VIDEOS:
+            videos = await self.bili_client.get_latest_videos(uid, raise_errors=True)
+            if videos:
+                for sub_user, sub_data in subscribers:
+                    await self._dispatch_subscriber(
+                        sub_user, sub_data, self._push_new_videos(sub_user, sub_data, videos)
+                    )
+
+    @staticmethod
+    def _live_subscribers(
+        subscribers: List[Tuple[str, Dict[str, Any]]],
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        return [
+            (sub_user, sub_data)
+            for sub_user, sub_data in subscribers
+            if "live" not in sub_data.get("filter_types", [])
+        ]
+
+    def _seed_live_state(self, uid: str, live_subs: List[Tuple[str, Dict[str, Any]]]):
+        # 状态表中没有记录时沿用旧版订阅数据中的 is_live，升级后不会重复通知
+        if uid not in self.live_states:
+            self.live_states.seed(
+                uid, any(sub_data.get("is_live", False) for _, sub_data in live_subs)
+            )
+
+    async def _notify_live(
+        self,
+        uid: str,
+        live_subs: List[Tuple[str, Dict[str, Any]]],
+        live_room: Dict,
+        live: bool,
+    ):
+        try:
+            await self._send_live_notice(
+                [sub_user for sub_user, _ in live_subs], live_room, live
+            )
+        except Exception as e:
+            logger.error(f"发送 UP 主 {uid} 的直播通知时发生错误: {e}\n{traceback.format_exc()}")
+
+    async def _on_live_event(self, uid: str, live: bool):
+        """直播间长连接收到开播 / 下播广播。补全直播间信息后按推送事件的状态通知。"""
+        live_subs = self._live_subscribers(
+            self._group_by_uid(self.data_manager.get_all_subscriptions()).get(uid, [])
+        )
+        if not live_subs:
+            return
+        self._seed_live_state(uid, live_subs)
+        state = self.live_states.get(uid)
+        if (state.get("live_status") == 1) == live:
+            return
+        try:
+            live_room = await self.bili_client.get_live_info_by_uids([int(uid)])
+        except Exception as e:
+            logger.warning(f"获取 UP 主 {uid} 的直播间信息失败，使用已记录的信息: {e}")
+            live_room = None
+        # 状态接口可能稍滞后于广播，以广播为准
+        live_room = dict(live_room or state, live_status=1 if live else 0)
+        if self.live_states.update(uid, live_room) is None:
+            # 等待查询期间已由轮询处理
+            return
+        await self.live_states.flush()
+        await self._notify_live(uid, live_subs, live_room, live)
+
+    @staticmethod
+    async def _dispatch_subscriber(sub_user: str, sub_data: Dict[str, Any], coro):
+        """单个会话推送失败不影响同一 UP 主的其他订阅者。"""
+        try:
+            await coro
+        except Exception as e:
+            logger.error(
+                f"处理订阅者 {sub_user} 的 UP主 {sub_data.get('uid', '未知UID')} 时发生未知错误: {e}\n{traceback.format_exc()}"
+            )
+
+    async def _push_new_dynamics(
+        self, sub_user: str, sub_data: Dict[str, Any], dynamics: List[ParsedDynamic]
+    ):
+        """为单个订阅筛选并推送新动态。"""
         uid = sub_data.get("uid")
-        if not uid:
+        result_list = await self._parse_and_filter_dynamics(dynamics, sub_data)
+        # 同时推进发布时间水位，之后切换为投稿视频来源时不会重复推送
+        newest_ts = max((d.pub_ts for d in dynamics), default=0)
+
+        # result_list 按从新到旧排列。result_list[0] 是最新的一条。
+        if result_list and result_list[0][1]:
+            # 无论是否推送，都直接将 ID 更新为这批动态中最顶端的一个，确保下次轮询跳过这批积攒的所有旧动态
+            latest_dyn_id = result_list[0][1]
+            await self.data_manager.update_last_dynamic_id(
+                sub_user, uid, latest_dyn_id, pub_ts=newest_ts
+            )
+
+            # 收集所有有效的（未被过滤的）渲染数据
+            valid_dynamics = [r for r, d in result_list if r]
+            await self._push_render_list(sub_user, uid, valid_dynamics)
+        elif newest_ts > (sub_data.get("last_pub_ts") or 0):
+            await self.data_manager.update_pub_watermark(sub_user, uid, newest_ts)
+
+    async def _push_render_list(self, sub_user: str, uid: Any, valid_dynamics: list):
+        """按防刷屏规则推送一批新内容，valid_dynamics 从新到旧排列。"""
+        if self.data_manager.is_suspended(sub_user):
             return
-        
-        logger.debug(f"正在检查 UP 主 {uid} 的更新...")
-        dyn = await self.bili_client.get_latest_dynamics(uid)
-        if dyn:
-            result_list = await self._parse_and_filter_dynamics(dyn, sub_data)
-            
-            # result_list 按从新到旧排列。result_list[0] 是最新的一条。
-            if result_list and result_list[0][1]:
-                # 无论是否推送，都直接将 ID 更新为这批动态中最顶端的一个，确保下次轮询跳过这批积攒的所有旧动态
-                latest_dyn_id = result_list[0][1]
-                await self.data_manager.update_last_dynamic_id(
-                    sub_user, uid, latest_dyn_id
+        if valid_dynamics and self.data_manager.get_digest_window(sub_user):
+            # 汇总模式：防刷屏规则同样适用，内容留待窗口结束时合并推送
+            if len(valid_dynamics) > self.dynamic_limit:
+                valid_dynamics = valid_dynamics[:1]
+            # 缓冲区随订阅数据写盘，水位已推进的内容在重启后不会丢失
+            await self.data_manager.buffer_digest(
+                sub_user, await self.renderer.detach_assets(list(reversed(valid_dynamics)))
+            )
+            return
+        if not valid_dynamics:
+            logger.debug(f"UP 主 {uid} 的新动态均被过滤或跳过。")
+        elif len(valid_dynamics) > self.dynamic_limit:
+            # 触发防刷屏机制：如果超过限制，则仅推送最新的一条
+            logger.info(f"检测到 UP 主 {uid} 有 {len(valid_dynamics)} 条新动态，超过限制 {self.dynamic_limit}，触发防刷屏，仅推送最新一条。")
+            await self._handle_new_dynamic(sub_user, valid_dynamics[0])
+        else:
+            # 未超过限制，按时间顺序（从旧到新）推送所有新动态
+            if len(valid_dynamics) > 1:
+                logger.info(f"检测到 UP 主 {uid} 有 {len(valid_dynamics)} 条新动态，正在连续推送...")
+            pending = list(reversed(valid_dynamics))
+            rendered = await self._prerender_batch(pending)
+            for render_data, img_path in zip(pending, rendered):
+                await self._handle_new_dynamic(
+                    sub_user, render_data, img_path=img_path
                 )
-                
-                # 收集所有有效的（未被过滤的）渲染数据
-                valid_dynamics = [r for r, d in result_list if r]
-                
-                if not valid_dynamics:
-                    logger.debug(f"UP 主 {uid} 的新动态均被过滤或跳过。")
-                elif len(valid_dynamics) > self.dynamic_limit:
-                    # 触发防刷屏机制：如果超过限制，则仅推送最新的一条
-                    logger.info(f"检测到 UP 主 {uid} 有 {len(valid_dynamics)} 条新动态，超过限制 {self.dynamic_limit}，触发防刷屏，仅推送最新一条。")
-                    await self._handle_new_dynamic(sub_user, valid_dynamics[0])
-                else:
-                    # 未超过限制，按时间顺序（从旧到新）推送所有新动态
-                    if len(valid_dynamics) > 1:
-                        logger.info(f"检测到 UP 主 {uid} 有 {len(valid_dynamics)} 条新动态，正在连续推送...")
-                    for render_data in reversed(valid_dynamics):
-                        await self._handle_new_dynamic(sub_user, render_data)
-
-        # 检查直播状态
-        if "live" in sub_data.get("filter_types", []):
+
+    async def _push_new_videos(
+        self, sub_user: str, sub_data: Dict[str, Any], videos: List[Dict[str, Any]]
+    ):
+        """
+        为仅关注视频的订阅推送新投稿。以 last_pub_ts 记录已推送到的发布时间（动态来源同样会推进），
+        尚无水位时只记录当前最新投稿的时间，不推送历史视频。
+        """
+        uid = sub_data.get("uid")
+        parsed = [parse_video(v) for v in videos]
+        newest_ts = max((v.pub_ts for v in parsed), default=0)
+        watermark = sub_data.get("last_pub_ts")
+        if watermark is None:
+            if newest_ts:
+                await self.data_manager.update_pub_watermark(sub_user, uid, newest_ts)
             return
-        # lives = await self.bili_client.get_live_info(uid)
-        lives = await self.bili_client.get_live_info_by_uids([uid])
-        if lives:
-            await self._handle_live_status(sub_user, sub_data, lives)
+        new_videos = sorted(
+            (v for v in parsed if v.pub_ts > watermark), key=lambda v: v.pub_ts, reverse=True
+        )
+        if not new_videos:
+            return
+        await self.data_manager.update_pub_watermark(sub_user, uid, newest_ts)
+
+        profile = self.bili_client.get_cached_profile(int(uid)) or {}
+        valid_videos = []
+        for video in new_videos:
+            if not video.author.face:
+                video.author.face = profile.get("face", "")
+            render_data = await self.renderer.build_render_data(video)
+            render_data["uid"] = uid
+            valid_videos.append(render_data)
+        await self._push_render_list(sub_user, uid, valid_videos)
+
+    def _needs_render(self, render_data: Dict[str, Any]) -> bool:
+        return self.rai or render_data.get("type") not in (
+            "DYNAMIC_TYPE_DRAW",
+            "DYNAMIC_TYPE_WORD",
+        )
+
+    async def _prerender_batch(self, render_data_list: list) -> list:
+        """
+        一次需要推送多张卡片时合并为批量渲染，返回与输入对应的图片路径（未预渲染的为 None）。
+        数量不足批量下限时不做预渲染，由 _handle_new_dynamic 逐张处理。
+        """
+        results = [None] * len(render_data_list)
+        indexes = [
+            i for i, d in enumerate(render_data_list) if self._needs_render(d)
+        ]
+        if len(indexes) < BATCH_RENDER_MIN or not self.renderer.health.available:
+            return results
+        paths = await self.renderer.render_many(
+            [render_data_list[i] for i in indexes]
+        )
+        for i, path in zip(indexes, paths):
+            results[i] = path
+        return results
 
     def _compose_plain_dynamic(
         self, render_data: Dict[str, Any], render_fail: bool = False
@@ -122,6 +490,70 @@ class DynamicListener:
             ls.append(Image.fromURL(pic))
         return ls
 
+    async def _deliver(self, sub_user: str, message, urgent: bool = False) -> bool:
+        """
+        将消息交给推送限速队列，按会话与平台的速率依次发出。已暂停的会话直接跳过。
+        返回是否已加入队列。
+        """
+        if self.data_manager.is_suspended(sub_user):
+            return False
+        self.governor.submit(sub_user, message, urgent=urgent)
+        return True
+
+    async def _send_now(self, sub_user: str, message) -> bool:
+        """
+        向会话发送消息并记录结果。
+        找不到消息平台或平台明确表示会话不可达时计为一次失败，连续失败达到上限且持续足够久时
+        暂停该会话的全部订阅；网络波动等其他异常只记录日志。
+        """
+        if self.data_manager.is_suspended(sub_user):
+            return False
+        error, permanent = "找不到对应的消息平台", True
+        start = time.perf_counter()
+        try:
+            sent = await self.context.send_message(sub_user, message)
+        except Exception as e:
+            sent, error = False, str(e)
+            permanent = self._is_permanent_delivery_error(e)
+        metrics.observe("send", time.perf_counter() - start)
+        metrics.inc("send.fail" if sent is False else "send.ok")
+        if sent is False:
+            logger.error(f"向 {sub_user} 推送消息失败: {error}")
+            if permanent:
+                await self._record_delivery_failure(sub_user, error)
+            return False
+        self._delivery_failures.pop(sub_user, None)
+        return True
+
+    @staticmethod
+    def _is_permanent_delivery_error(error: Exception) -> bool:
+        text = str(error).lower()
+        return any(keyword in text for keyword in PERMANENT_DELIVERY_ERRORS)
+
+    async def _record_delivery_failure(self, sub_user: str, error: str):
+        count, first = self._delivery_failures.get(sub_user, (0, time.time()))
+        count += 1
+        self._delivery_failures[sub_user] = (count, first)
+        if (
+            self.delivery_failure_limit <= 0
+            or count < self.delivery_failure_limit
+            or time.time() - first < DELIVERY_SUSPEND_MIN_SPAN
+        ):
+            return
+        self._delivery_failures.pop(sub_user, None)
+        suspended = await self.data_manager.suspend_session(sub_user, error)
+        report = (
+            f"会话 {sub_user} 连续 {count} 次推送失败，已暂停其 {suspended} 条订阅。\n"
+            f"最后一次错误: {error}\n"
+            f"恢复请使用: /恢复订阅 {sub_user}"
+        )
+        logger.warning(report)
+        if self.admin_sid and self.admin_sid != sub_user:
+            try:
+                await self.context.send_message(self.admin_sid, MessageChain().message(report))
+            except Exception as e:
+                logger.error(f"向管理员会话 {self.admin_sid} 发送报告失败: {e}")
+
     async def _send_dynamic(
         self, sub_user: str, chain_parts: list, send_node: bool = False
     ):
@@ -131,41 +563,73 @@ class DynamicListener:
                 name="AstrBot",
                 content=chain_parts,
             )
-            await self.context.send_message(
-                sub_user, MessageEventResult(chain=[qqNode])
-            )
+            await self._deliver(sub_user, MessageEventResult(chain=[qqNode]))
         else:
-            await self.context.send_message(
+            await self._deliver(
                 sub_user, MessageEventResult(chain=chain_parts).use_t2i(False)
             )
 
-    async def _handle_new_dynamic(self, sub_user: str, render_data: Dict[str, Any]):
-        """处理并发送新的动态通知。"""
-        if not render_data:
+    async def _send_digest(self, sub_user: str, items: List[Dict[str, Any]]):
+        """
+        将一段时间内收集的内容合并为一条转发消息：需要渲染的卡片批量渲染一次，
+        其余内容以纯文本附在其中，通过 _send_dynamic 的转发节点一次发出。
+        """
+        if not items or self.data_manager.is_suspended(sub_user):
+            return
+        omitted = max(0, len(items) - DIGEST_MAX_ITEMS)
+        items = items[omitted:]
+        to_render = [d for d in items if self._needs_render(d)]
+        paths = await self.renderer.render_many(to_render) if to_render else []
+        rendered = {id(d): path for d, path in zip(to_render, paths)}
+
+        header = f"📰 订阅更新汇总，共 {len(items) + omitted} 条"
+        if omitted:
+            header += f"（仅展示最新 {len(items)} 条）"
+        ls = [Plain(header + "\n")]
+        for render_data in items:
+            img_path = rendered.get(id(render_data))
+            if img_path:
+                img_paths = await optimize_render_output(img_path)
+                ls.extend(Image.fromFileSystem(p) for p in img_paths)
+                ls.append(Plain(f"\n{render_data.get('url', '')}\n"))
+            else:
+                ls.extend(self._compose_plain_dynamic(render_data))
+                ls.append(Plain("\n"))
+        await self._send_dynamic(sub_user, ls, send_node=True)
+
+    async def _handle_new_dynamic(
+        self,
+        sub_user: str,
+        render_data: Dict[str, Any],
+        priority: int = PRIORITY_BACKGROUND,
+        img_path: Optional[str] = None,
+    ):
+        """
+        处理并发送新的动态通知。
+        img_path: 已预渲染（如批量渲染）的图片路径，提供时跳过渲染
+        """
+        if not render_data or self.data_manager.is_suspended(sub_user):
             return
         # 非图文混合模式
-        if not self.rai and render_data.get("type") in (
-            "DYNAMIC_TYPE_DRAW",
-            "DYNAMIC_TYPE_WORD",
-        ):
+        if not self._needs_render(render_data):
             ls = self._compose_plain_dynamic(render_data)
             await self._send_dynamic(sub_user, ls)
         # 默认渲染成图片
         else:
-            img_path = await self.renderer.render_dynamic(render_data)
+            if not img_path and self.renderer.health.available:
+                img_path = await self.renderer.render_dynamic(
+                    render_data, priority=priority
+                )
             if img_path:
                 url = render_data.get("url", "")
-                if await is_height_valid(img_path):
-                    ls = [Image.fromFileSystem(img_path)]
-                else:
-                    timestamp = int(time.time())
-                    filename = f"bilibili_dynamic_{timestamp}.jpg"
-                    ls = [File(file=img_path, name=filename)]
+                # 过长的卡片切分为多张图片，过大的图片压缩到字节预算内
+                img_paths = await optimize_render_output(img_path)
+                ls = [Image.fromFileSystem(p) for p in img_paths]
                 ls.append(Plain(f"\n{url}"))
                 if self.node:
                     await self._send_dynamic(sub_user, ls, send_node=True)
                 else:
-                    await self.context.send_message(
+                    await self._deliver(
                         sub_user, MessageEventResult(chain=ls).use_t2i(False)
                     )
             else:
@@ -176,182 +640,178 @@ class DynamicListener:
     async def _handle_live_status(
         self, sub_user: str, sub_data: Dict, live_room: Dict, test_mode: bool = False
     ):
-        """处理并发送直播状态变更通知。"""
-        is_live = sub_data.get("is_live", False)
+        """按订阅记录中的 is_live 判断状态是否变化并发送通知，test_mode 下总是发送。"""
+        is_live = live_room.get("live_status") == 1
+        if not test_mode and bool(sub_data.get("is_live", False)) == is_live:
+            return
+        await self._send_live_notice(
+            [sub_user],
+            live_room,
+            is_live,
+            priority=PRIORITY_INTERACTIVE if test_mode else PRIORITY_LIVE,
+        )
 
-        live_name = live_room.get("title", "Unknown")
+    async def _send_live_notice(
+        self,
+        sub_users: List[str],
+        live_room: Dict,
+        live: bool,
+        priority: int = PRIORITY_LIVE,
+    ):
+        """
+        发送开播 / 下播通知。只在状态确实变化时调用，
+        同一 UP 主的所有订阅会话共用一次渲染结果。
+        """
+        sub_users = [u for u in sub_users if not self.data_manager.is_suspended(u)]
+        if not sub_users:
+            return
+        # live_status: 0：未开播    1：正在直播     2：轮播中
         user_name = live_room.get("uname", "Unknown")
         cover_url = live_room.get("cover_from_user", "")
-        room_id = live_room.get("room_id", 0)
-        link = f"https://live.bilibili.com/{room_id}"
+        link = f"https://live.bilibili.com/{live_room.get('room_id', 0)}"
 
         render_data = await create_render_data()
-        render_data["banner"] = await image_to_base64(BANNER_PATH)
+        render_data["banner"] = await self.renderer.asset_src(BANNER_PATH)
         render_data["name"] = "AstrBot"
-        render_data["avatar"] = await image_to_base64(LOGO_PATH)
-        render_data["title"] = live_name
+        render_data["avatar"] = await self.renderer.asset_src(LOGO_PATH)
+        render_data["title"] = live_room.get("title", "Unknown")
         render_data["url"] = link
         render_data["image_urls"] = [cover_url]
-        # live_status: 0：未开播    1：正在直播     2：轮播中
-        if live_room.get("live_status", "") == 1 and (not is_live or test_mode):
-            render_data["text"] = f"📣 你订阅的UP 「{user_name}」 开播了！"
-            if not test_mode:
-                await self.data_manager.update_live_status(
-                    sub_user, sub_data["uid"], True
-                )
-        if live_room.get("live_status", "") != 1 and (is_live or test_mode):
-            if test_mode and live_room.get("live_status", "") == 1:
-                pass  # test_mode 下优先显示开播
-            else:
-                render_data["text"] = f"📣 你订阅的UP 「{user_name}」 下播了！"
-                if not test_mode:
-                    await self.data_manager.update_live_status(
-                        sub_user, sub_data["uid"], False
-                    )
-        if render_data.get("text"):
-            render_data["qrcode"] = await create_qrcode(link)
-            img_path = await self.renderer.render_dynamic(render_data)
+        render_data["text"] = (
+            f"📣 你订阅的UP 「{user_name}」 开播了！"
+            if live
+            else f"📣 你订阅的UP 「{user_name}」 下播了！"
+        )
+        render_data["qrcode"] = await create_qrcode(link)
+        img_path = await self.renderer.render_dynamic(render_data, priority=priority)
+        for sub_user in sub_users:
             if img_path:
-                await self.context.send_message(
+                await self._deliver(
                     sub_user,
                     MessageChain().file_image(img_path).message(render_data["url"]),
+                    urgent=True,
                 )
             else:
                 text = "\n".join(filter(None, render_data.get("text", "").split("\n")))
-                await self.context.send_message(
+                await self._deliver(
                     sub_user,
                     MessageChain()
                     .message("渲染图片失败了 (´;ω;`)")
                     .message(text)
                     .url_image(cover_url),
+                    urgent=True,
                 )
 
-    async def _get_dynamic_items(self, dyn: Dict, data: Dict):
-        """获取动态条目列表。"""
+    async def _get_dynamic_items(
+        self, dynamics: List[ParsedDynamic], data: Dict
+    ) -> List[ParsedDynamic]:
+        """获取新动态列表（不含已推送及置顶的动态）。"""
         last = data["last"]
-        items = dyn["items"]
         recent_ids = data.get("recent_ids", []) or []
         known_ids = {x for x in ([last] + recent_ids) if x}
+        # 此前由投稿视频来源推送时 last 不会更新，以发布时间水位兜底
+        watermark = data.get("last_pub_ts") or 0
         new_items = []
 
-        for item in items:
-            if "modules" not in item:
-                continue
+        for dyn in dynamics:
             # 过滤置顶
-            if (
-                item["modules"].get("module_tag")
-                and item["modules"]["module_tag"].get("text") == "置顶"
-            ):
+            if dyn.pinned:
                 continue
-
-            if item["id_str"] in known_ids:
+            if dyn.id_str in known_ids or (dyn.pub_ts and dyn.pub_ts <= watermark):
                 break
-            new_items.append(item)
+            new_items.append(dyn)
 
         return new_items
 
-    async def _parse_and_filter_dynamics(self, dyn: Dict, data: Dict):
+    def _match_filter_regex(self, text: str, filter_regex: List[str]) -> Optional[str]:
+        """返回第一个匹配 text 的正则，均不匹配时返回 None。"""
+        if not text:
+            return None
+        for regex_pattern in filter_regex:
+            try:
+                if re.search(regex_pattern, text):
+                    return regex_pattern
+            except re.error:
+                continue  # 如果正则表达式本身有误，跳过这个正则继续检查下一个
+        return None
+
+    async def _parse_and_filter_dynamics(
+        self, dyn: Union[Dict, List[ParsedDynamic], None], data: Dict
+    ):
         """
         解析并过滤动态。
+        dyn: 已解析的动态列表，或接口返回的原始动态页（将立即解析并丢弃）
         """
         filter_types = data.get("filter_types", [])
         filter_regex = data.get("filter_regex", [])
         uid = data.get("uid", "")
-        items = await self._get_dynamic_items(dyn, data)  # 不含last及置顶的动态列表
-        
-        logger.info(f"DEBUG: 获取到 {len(items) if items else 0} 条新动态 (原始总计: {len(dyn.get('items', [])) if dyn else 0} 条)")
-        
+        dynamics = dyn if isinstance(dyn, list) else parse_feed(dyn)
+        items = await self._get_dynamic_items(dynamics, data)  # 不含last及置顶的动态列表
+
+        logger.info(f"DEBUG: 获取到 {len(items)} 条新动态 (原始总计: {len(dynamics)} 条)")
+
         result_list = []
         # 无新动态
         if not items:
             result_list.append((None, None))
 
         for item in items:
-            dyn_id = item.get("id_str")
-            dyn_type = item.get("type")
-            logger.info(f"DEBUG: 正在处理动态 ID: {dyn_id}, 类型: {dyn_type}")
-            
+            dyn_id = item.id_str
+            logger.info(f"DEBUG: 正在处理动态 ID: {dyn_id}, 类型: {item.raw_type}")
+
             # 转发类型
-            if item.get("type") == "DYNAMIC_TYPE_FORWARD":
+            if item.type == DynamicType.FORWARD:
                 if "forward" in filter_types:
                     logger.info(f"转发类型在过滤列表 {filter_types} 中。")
-                    # return None, dyn_id  # 返回 None 表示不推送，但更新 dyn_id
                     result_list.append((None, dyn_id))
                     continue
-                try:
-                    content_text = item["modules"]["module_dynamic"]["desc"]["text"]
-                except (TypeError, KeyError):
-                    content_text = None
-                if content_text and filter_regex:
-                    matched = False
-                    for regex_pattern in filter_regex:
-                        try:
-                            if re.search(regex_pattern, content_text):
-                                logger.info(f"转发内容匹配正则 {regex_pattern}。")
-                                result_list.append((None, dyn_id))
-                                matched = True
-                                break
-                        except re.error as e:
-                            continue
-                    if matched:
+                if filter_regex:
+                    pattern = self._match_filter_regex(item.text, filter_regex)
+                    if pattern:
+                        logger.info(f"转发内容匹配正则 {pattern}。")
+                        result_list.append((None, dyn_id))
                         continue
                 render_data = await self.renderer.build_render_data(item)
                 render_data["uid"] = uid
                 render_data["url"] = f"https://t.bilibili.com/{dyn_id}"
                 render_data["qrcode"] = await create_qrcode(render_data["url"])
 
-                render_forward = await self.renderer.build_render_data(
-                    item["orig"], is_forward=True
-                )
-                if render_forward["image_urls"]:  # 检查列表是否非空
-                    render_forward["image_urls"] = [
-                        render_forward["image_urls"][0]
-                    ]  # 保留第一项
-                render_data["forward"] = render_forward
+                if item.orig:
+                    render_forward = await self.renderer.build_render_data(
+                        item.orig, is_forward=True
+                    )
+                    if render_forward["image_urls"]:  # 检查列表是否非空
+                        render_forward["image_urls"] = [
+                            render_forward["image_urls"][0]
+                        ]  # 保留第一项
+                    render_data["forward"] = render_forward
                 result_list.append((render_data, dyn_id))
-            elif item.get("type") in ("DYNAMIC_TYPE_DRAW", "DYNAMIC_TYPE_WORD"):
+            elif item.type in (DynamicType.DRAW, DynamicType.WORD):
                 # 图文类型过滤
                 if "draw" in filter_types:
                     logger.info(f"图文类型在过滤列表 {filter_types} 中。")
                     result_list.append((None, dyn_id))
                     continue
-
-                major = (
-                    item.get("modules", {}).get("module_dynamic", {}).get("major", {})
-                )
-                if major.get("type") == "MAJOR_TYPE_BLOCKED":
+                if item.blocked:
                     logger.info(f"图文动态 {dyn_id} 为充电专属。")
                     result_list.append((None, dyn_id))
                     continue
-                opus = major["opus"]
-                summary_text = opus["summary"]["text"]
-
-                if (
-                    opus["summary"]["rich_text_nodes"][0].get("text") == "互动抽奖"
-                    and "lottery" in filter_types
-                ):
+                if item.is_lottery and "lottery" in filter_types:
                     logger.info(f"互动抽奖在过滤列表 {filter_types} 中。")
                     result_list.append((None, dyn_id))
                     continue
                 if filter_regex:  # 检查列表是否存在且不为空
-                    matched = False
-                    for regex_pattern in filter_regex:
-                        try:
-                            if re.search(regex_pattern, summary_text):
-                                logger.info(
-                                    f"图文动态 {dyn_id} 的 summary 匹配正则 '{regex_pattern}'。"
-                                )
-                                result_list.append((None, dyn_id))
-                                matched = True
-                                break
-                        except re.error as e:
-                            continue  # 如果正则表达式本身有误，跳过这个正则继续检查下一个
-                    if matched:
+                    pattern = self._match_filter_regex(item.text, filter_regex)
+                    if pattern:
+                        logger.info(
+                            f"图文动态 {dyn_id} 的 summary 匹配正则 '{pattern}'。"
+                        )
+                        result_list.append((None, dyn_id))
                         continue
                 render_data = await self.renderer.build_render_data(item)
                 render_data["uid"] = uid
                 result_list.append((render_data, dyn_id))
-            elif item.get("type") == "DYNAMIC_TYPE_AV":
+            elif item.type == DynamicType.AV:
                 # 视频类型过滤
                 if "video" in filter_types:
                     logger.info(f"视频类型在过滤列表 {filter_types} 中。")
@@ -360,27 +820,24 @@ class DynamicListener:
                 render_data = await self.renderer.build_render_data(item)
                 render_data["uid"] = uid
                 result_list.append((render_data, dyn_id))
-            elif item.get("type") == "DYNAMIC_TYPE_ARTICLE":
+            elif item.type == DynamicType.ARTICLE:
                 # 文章类型过滤
                 if "article" in filter_types:
                     logger.info(f"文章类型在过滤列表 {filter_types} 中。")
                     result_list.append((None, dyn_id))
                     continue
-                major = (
-                    item.get("modules", {}).get("module_dynamic", {}).get("major", {})
-                )
-                if major.get("type") == "MAJOR_TYPE_BLOCKED":
+                if item.blocked:
                     logger.info(f"文章 {dyn_id} 为充电专属。")
                     result_list.append((None, dyn_id))
                     continue
                 render_data = await self.renderer.build_render_data(item)
                 render_data["uid"] = uid
                 result_list.append((render_data, dyn_id))
-            elif item.get("type") == "DYNAMIC_TYPE_LIVE_RCMD":
+            elif item.type == DynamicType.LIVE_RCMD:
                 logger.info(f"DEBUG: 忽略直播推荐动态 {dyn_id}")
                 result_list.append((None, dyn_id))
             else:
-                logger.info(f"DEBUG: 遇到未知动态类型 {item.get('type')}, ID: {dyn_id}")
+                logger.info(f"DEBUG: 遇到未知动态类型 {item.raw_type}, ID: {dyn_id}")
                 result_list.append((None, dyn_id))
 
         return result_list
@@ -0,0 +1,344 @@
+import json
+import time
+import zlib
+import struct
+import asyncio
+import aiohttp
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from astrbot.api import logger
+from .constant import (
+    LIVE_WS_ROOMS_PER_WORKER,
+    LIVE_WS_HEARTBEAT,
+    LIVE_WS_IDLE_TIMEOUT,
+    LIVE_WS_RECONNECT_BASE,
+    LIVE_WS_RECONNECT_MAX,
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 弹幕协议数据包头：总长度、头部长度、协议版本、操作码、序号
+HEADER = struct.Struct(">IHHII")
+
+PROTO_JSON = 0
+PROTO_INT = 1
+PROTO_ZLIB = 2
+PROTO_BROTLI = 3
+
+OP_HEARTBEAT = 2
+OP_HEARTBEAT_REPLY = 3
+OP_MESSAGE = 5
+OP_AUTH = 7
+OP_AUTH_REPLY = 8
+
+# 开播 / 下播（含转为轮播）对应的广播命令
+LIVE_START_CMDS = {"LIVE"}
+LIVE_END_CMDS = {"PREPARING", "ROUND"}
+
+
+def pack(op: int, body: bytes = b"", proto: int = PROTO_INT) -> bytes:
+    return HEADER.pack(HEADER.size + len(body), HEADER.size, proto, op, 1) + body
+
+
+def unpack(data: bytes) -> List[Tuple[int, Any]]:
+    """解析一帧数据为 (操作码, 内容) 列表，压缩包会展开为其中的多个数据包。"""
+    packets = []
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        length, header_len, proto, op, _ = HEADER.unpack_from(data, offset)
+        if length < header_len:
+            break
+        body = data[offset + header_len : offset + length]
+        offset += length
+        if proto == PROTO_ZLIB:
+            packets.extend(unpack(zlib.decompress(body)))
+        elif proto == PROTO_BROTLI:
+            if brotli is not None:
+                packets.extend(unpack(brotli.decompress(body)))
+        elif op == OP_HEARTBEAT_REPLY:
+            packets.append((op, int.from_bytes(body[:4], "big")))
+        elif op in (OP_MESSAGE, OP_AUTH_REPLY):
+            try:
+                packets.append((op, json.loads(body)))
+            except ValueError:
+                continue
+    return packets
+
+
+@dataclass(eq=False)
+class LiveRoomConnection:
+    """一个直播间的连接状态。connected 表示已通过鉴权、可以接收事件。"""
+
+    uid: str
+    room_id: int
+    ws: Optional[aiohttp.ClientWebSocketResponse] = field(default=None, repr=False)
+    connected: bool = False
+    live: Optional[bool] = None
+    failures: int = 0
+    retry_at: float = 0.0
+    last_recv: float = 0.0
+    removed: bool = False
+
+
+@dataclass(eq=False)
+class _Worker:
+    rooms: List[LiveRoomConnection] = field(default_factory=list)
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+    task: Optional[asyncio.Task] = None
+
+
+class LiveRoomMonitor:
+    """
+    直播间长连接监控。通过弹幕服务器的 websocket 连接接收开播 / 下播广播，
+    连接由少量任务复用：每个任务负责若干直播间，统一收包、发送心跳与断线重连。
+    超出连接上限或尚未连上的直播间由轮询负责，is_connected 用于判断。
+    on_event(uid, live) 在独立任务中执行，不会阻塞收包。
+    """
+
+    def __init__(
+        self,
+        bili_client,
+        on_event: Callable[[str, bool], Awaitable[Any]],
+        max_rooms: int,
+        server_url: str = "",
+    ):
+        self.bili_client = bili_client
+        self.on_event = on_event
+        self.max_rooms = max_rooms
+        # 指定后不再向接口获取弹幕服务器地址，便于接入本地中转或测试服务
+        self.server_url = server_url
+        self._rooms: Dict[str, LiveRoomConnection] = {}
+        self._workers: List[_Worker] = []
+        self._callbacks: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "rooms": len(self._rooms),
+            "connected": sum(room.connected for room in self._rooms.values()),
+            "workers": len(self._workers),
+        }
+
+    def is_connected(self, uid: str) -> bool:
+        room = self._rooms.get(str(uid))
+        return room is not None and room.connected
+
+    def watch(self, uid: str, room_id: int) -> bool:
+        """开始监听 UP 主的直播间，已达连接上限时返回 False。"""
+        uid = str(uid)
+        room = self._rooms.get(uid)
+        if room is not None:
+            if room.room_id == room_id:
+                return True
+            self._remove(room)
+        if not room_id or len(self._rooms) >= self.max_rooms:
+            return False
+        room = LiveRoomConnection(uid, int(room_id))
+        self._rooms[uid] = room
+        self._assign(room)
+        return True
+
+    def retain(self, uids: Iterable[str]):
+        """只保留仍需监听的 UP 主，其余连接关闭。"""
+        keep = {str(uid) for uid in uids}
+        for uid in [uid for uid in self._rooms if uid not in keep]:
+            self._remove(self._rooms[uid])
+
+    def _remove(self, room: LiveRoomConnection):
+        self._rooms.pop(room.uid, None)
+        room.removed = True
+        room.connected = False
+        for worker in self._workers:
+            if room in worker.rooms:
+                worker.wakeup.set()
+
+    def _assign(self, room: LiveRoomConnection):
+        for worker in self._workers:
+            if len(worker.rooms) < LIVE_WS_ROOMS_PER_WORKER:
+                worker.rooms.append(room)
+                worker.wakeup.set()
+                return
+        worker = _Worker(rooms=[room])
+        worker.task = asyncio.create_task(self._run(worker))
+        self._workers.append(worker)
+
+    async def close(self):
+        tasks = [w.task for w in self._workers if w.task] + list(self._callbacks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers.clear()
+        self._callbacks.clear()
+        self._rooms.clear()
+
+    async def _run(self, worker: _Worker):
+        receivers: Dict[asyncio.Future, Tuple[LiveRoomConnection, Any]] = {}
+        next_heartbeat = time.monotonic() + LIVE_WS_HEARTBEAT
+        try:
+            while True:
+                for room in [r for r in worker.rooms if r.removed]:
+                    worker.rooms.remove(room)
+                    await self._disconnect(room)
+                if not worker.rooms:
+                    break
+
+                now = time.monotonic()
+                pending = [r for r in worker.rooms if r.ws is None and now >= r.retry_at]
+                if pending:
+                    await asyncio.gather(*(self._connect(r) for r in pending))
+
+                now = time.monotonic()
+                if now >= next_heartbeat:
+                    next_heartbeat = now + LIVE_WS_HEARTBEAT
+                    for room in worker.rooms:
+                        if room.ws is not None:
+                            await self._send(room, pack(OP_HEARTBEAT))
+                for room in worker.rooms:
+                    if room.ws is not None and now - room.last_recv > LIVE_WS_IDLE_TIMEOUT:
+                        await self._drop(room, "长时间未收到数据")
+
+                watching = {ws for _, ws in receivers.values()}
+                for room in worker.rooms:
+                    if room.ws is not None and room.ws not in watching:
+                        receivers[asyncio.ensure_future(room.ws.receive())] = (room, room.ws)
+
+                deadline = min(
+                    [next_heartbeat] + [r.retry_at for r in worker.rooms if r.ws is None]
+                )
+                wakeup = asyncio.ensure_future(worker.wakeup.wait())
+                done, _ = await asyncio.wait(
+                    [wakeup, *receivers],
+                    timeout=max(0.0, deadline - time.monotonic()),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                wakeup.cancel()
+                worker.wakeup.clear()
+                for fut in done:
+                    if fut is wakeup:
+                        continue
+                    room, ws = receivers.pop(fut)
+                    if room.ws is ws:
+                        await self._handle(room, fut)
+        finally:
+            for fut in receivers:
+                fut.cancel()
+            for room in worker.rooms:
+                await self._disconnect(room)
+            if worker in self._workers:
+                self._workers.remove(worker)
+
+    async def _connect(self, room: LiveRoomConnection):
+        try:
+            if self.server_url:
+                token, hosts = "", [self.server_url]
+            else:
+                token, hosts = await self.bili_client.get_danmu_server(room.room_id)
+                if not hosts:
+                    raise RuntimeError("未获取到弹幕服务器地址")
+            ws = await self.bili_client.ws_connect(hosts[room.failures % len(hosts)])
+            credential = self.bili_client.credential
+            auth = {
+                "uid": 0,
+                "roomid": room.room_id,
+                # 只请求 zlib 压缩，无需 brotli 依赖
+                "protover": PROTO_ZLIB,
+                "platform": "web",
+                "type": 2,
+                "key": token,
+            }
+            if credential is not None and credential.buvid3:
+                auth["buvid"] = credential.buvid3
+            await ws.send_bytes(
+                pack(OP_AUTH, json.dumps(auth, separators=(",", ":")).encode())
+            )
+        except Exception as e:
+            self._schedule_retry(room, f"连接失败: {e}")
+            return
+        if room.removed:
+            await ws.close()
+            return
+        room.ws = ws
+        room.last_recv = time.monotonic()
+
+    async def _handle(self, room: LiveRoomConnection, fut: asyncio.Future):
+        try:
+            msg = fut.result()
+        except Exception as e:
+            await self._drop(room, f"接收数据失败: {e}")
+            return
+        if msg.type != aiohttp.WSMsgType.BINARY:
+            if msg.type in (
+                aiohttp.WSMsgType.CLOSE,
+                aiohttp.WSMsgType.CLOSING,
+                aiohttp.WSMsgType.CLOSED,
+                aiohttp.WSMsgType.ERROR,
+            ):
+                await self._drop(room, "连接已关闭")
+            return
+        room.last_recv = time.monotonic()
+        try:
+            packets = unpack(msg.data)
+        except Exception as e:
+            logger.debug(f"直播间 {room.room_id} 数据包解析失败: {e}")
+            return
+        for op, body in packets:
+            if op == OP_AUTH_REPLY:
+                if body.get("code", 0) != 0:
+                    await self._drop(room, f"鉴权失败: {body}")
+                    return
+                if room.failures:
+                    logger.info(f"直播间 {room.room_id} 已重新连接")
+                room.connected = True
+                room.failures = 0
+                # 鉴权后立即发送一次心跳，服务器据此开始推送
+                await self._send(room, pack(OP_HEARTBEAT))
+            elif op == OP_MESSAGE and isinstance(body, dict):
+                cmd = str(body.get("cmd", "")).split(":", 1)[0]
+                if cmd in LIVE_START_CMDS:
+                    self._emit(room, True)
+                elif cmd in LIVE_END_CMDS:
+                    self._emit(room, False)
+
+    def _emit(self, room: LiveRoomConnection, live: bool):
+        # 开播广播通常会重复下发，同一状态只通知一次
+        if room.live is live:
+            return
+        room.live = live
+        logger.info(f"直播间 {room.room_id} (UP 主 {room.uid}) {'开播' if live else '下播'}")
+        task = asyncio.ensure_future(self.on_event(room.uid, live))
+        self._callbacks.add(task)
+        task.add_done_callback(self._callbacks.discard)
+
+    async def _send(self, room: LiveRoomConnection, data: bytes):
+        try:
+            await room.ws.send_bytes(data)
+        except Exception as e:
+            await self._drop(room, f"发送数据失败: {e}")
+
+    async def _drop(self, room: LiveRoomConnection, reason: str):
+        await self._disconnect(room)
+        if not room.removed:
+            self._schedule_retry(room, reason)
+
+    async def _disconnect(self, room: LiveRoomConnection):
+        ws, room.ws = room.ws, None
+        room.connected = False
+        # 断线期间的状态变化由轮询处理，重连后不再沿用旧状态去重
+        room.live = None
+        if ws is not None and not ws.closed:
+            try:
+                await ws.close()
+            except Exception:
+                pass
+
+    def _schedule_retry(self, room: LiveRoomConnection, reason: str):
+        room.failures += 1
+        delay = min(LIVE_WS_RECONNECT_MAX, LIVE_WS_RECONNECT_BASE * 2 ** (room.failures - 1))
+        room.retry_at = time.monotonic() + delay
+        log = logger.warning if room.failures == 1 else logger.debug
+        log(f"直播间 {room.room_id} {reason}，{delay:.0f} 秒后重连，期间由轮询检查")
@@ -0,0 +1,67 @@
+from typing import Any, Dict, Iterable, Optional
+from .data_manager import DataManager
+
+# 直播状态表中保存的直播间字段
+_ROOM_FIELDS = ("room_id", "title", "cover_from_user", "uname")
+
+
+class LiveStateTable:
+    """
+    按 UP 主记录直播间状态（直播间号、开播状态、标题、封面），与订阅数据保存在同一文件中。
+    每次查询结果与表中状态比较，只有开播 / 下播发生变化时才返回状态转换；
+    标题等字段变化只更新内存，由 flush 统一写盘。
+    """
+
+    def __init__(self, data_manager: DataManager):
+        self.data_manager = data_manager
+        self._dirty = False
+
+    @property
+    def _states(self) -> Dict[str, Dict[str, Any]]:
+        return self.data_manager.data.setdefault("live_state", {})
+
+    def __contains__(self, uid: str) -> bool:
+        return str(uid) in self._states
+
+    def get(self, uid: str) -> Optional[Dict[str, Any]]:
+        return self._states.get(str(uid))
+
+    def seed(self, uid: str, is_live: bool):
+        """为尚未记录的 UP 主设置初始状态（例如沿用旧版订阅中的 is_live）。"""
+        self._states.setdefault(str(uid), {"live_status": 1 if is_live else 0})
+        self._dirty = True
+
+    def update(self, uid: str, live_room: Dict[str, Any]) -> Optional[bool]:
+        """
+        用查询到的直播间信息更新状态表。开播返回 True，下播返回 False，无变化返回 None。
+        live_status 为 2（轮播）视为未开播。
+        """
+        state = self._states.get(str(uid))
+        if state is None:
+            state = self._states[str(uid)] = {"live_status": 0}
+            self._dirty = True
+        for key in _ROOM_FIELDS:
+            value = live_room.get(key)
+            if value is not None and state.get(key) != value:
+                state[key] = value
+                self._dirty = True
+        was_live = state.get("live_status") == 1
+        is_live = live_room.get("live_status") == 1
+        if was_live == is_live:
+            return None
+        state["live_status"] = 1 if is_live else 0
+        self._dirty = True
+        return is_live
+
+    def retain(self, uids: Iterable[str]):
+        """移除已无人关注直播的 UP 主。"""
+        keep = {str(uid) for uid in uids}
+        for uid in [uid for uid in self._states if uid not in keep]:
+            del self._states[uid]
+            self._dirty = True
+
+    async def flush(self):
+        """有改动时写盘一次。"""
+        if self._dirty:
+            self._dirty = False
+            await self.data_manager.save()
@@ -1,19 +1,25 @@
+import os
 import re
 import json
+import time
 import asyncio
 from typing import List
 
 from astrbot.api.event import filter, AstrMessageEvent, MessageEventResult
-from astrbot.api.star import Context, Star, register
+from astrbot.api.star import Context, Star, StarTools, register
 from astrbot.api.event.filter import PermissionType, EventMessageType
 from astrbot.api import logger, AstrBotConfig
 from astrbot.api.message_components import Image, Plain
 
 from .utils import *
 from .renderer import Renderer
+from .render_scheduler import PRIORITY_INTERACTIVE
+from .asset_server import AssetServer
 from .bili_client import BiliClient
 from .listener import DynamicListener
 from .data_manager import DataManager
+from .metrics import metrics
+from .models import parse_feed
 from .constant import (
     VALID_FILTER_TYPES,
     BV,
@@ -40,12 +46,41 @@ class Main(Star):
         self.style = self.cfg.get("renderer_template", DEFAULT_TEMPLATE)
 
         self.data_manager = DataManager()
-        self.renderer = Renderer(self, self.rai, self.style)
+        self.asset_server = None
+        if self.cfg.get("asset_server", False):
+            self.asset_server = AssetServer(
+                cache_dir=os.path.join(
+                    StarTools.get_data_dir(plugin_name="astrbot_plugin_bilibili"),
+                    "image_cache",
+                ),
+                host=self.cfg.get("asset_server_host", "127.0.0.1"),
+                port=int(self.cfg.get("asset_server_port", 18086)),
+                public_url=self.cfg.get("asset_server_url", ""),
+                user_agent=self.cfg.get("user_agent"),
+            )
+            self.asset_server_task = asyncio.create_task(self.asset_server.start())
+        self.renderer = Renderer(
+            self,
+            self.rai,
+            self.style,
+            self.asset_server,
+            prerender=self.cfg.get("local_prerender", False),
+            max_concurrency=int(self.cfg.get("render_concurrency", 2)),
+        )
         self.bili_client = BiliClient(
             self.cfg.get("sessdata"),
             self.cfg.get("bili_jct"),
             self.cfg.get("buvid3"),
             self.cfg.get("user_agent"),
+            cache_path=os.path.join(
+                StarTools.get_data_dir(plugin_name="astrbot_plugin_bilibili"),
+                "api_cache.json",
+            )
+            if self.cfg.get("persist_api_cache", True)
+            else None,
+            extra_credentials=self.cfg.get("credential_pool", []),
+            proxies=self.cfg.get("proxy_pool", []),
+            proxy_rate=float(self.cfg.get("proxy_rate", 1.0)),
         )
         self.dynamic_listener = DynamicListener(
             context=self.context,
@@ -132,7 +167,7 @@ class Main(Star):
 
             render_data = await create_render_data()
             render_data["name"] = "AstrBot"
-            render_data["avatar"] = await image_to_base64(LOGO_PATH)
+            render_data["avatar"] = await self.renderer.asset_src(LOGO_PATH)
             render_data["title"] = info["title"]
             render_data["text"] = (
                 f"UP 主: {info['owner']['name']}<br>"
@@ -143,7 +178,9 @@ class Main(Star):
             )
             render_data["image_urls"] = [info["pic"]]
 
-            img_path = await self.renderer.render_dynamic(render_data)
+            img_path = await self.renderer.render_dynamic(
+                render_data, priority=PRIORITY_INTERACTIVE
+            )
             if img_path:
                 yield event.chain_result([Image.fromFileSystem(img_path)])
             else:
@@ -179,6 +216,11 @@ class Main(Star):
             event.stop_event()
             return
 
+        # 会话因推送失败被暂停时，重新订阅即视为恢复，原有订阅一并放回
+        restored = await self.data_manager.resume_session(sub_user)
+        if restored:
+            yield event.plain_result(f"当前会话此前因推送失败被暂停，已恢复原有的 {restored} 条订阅。")
+
         # 检查是否已经存在该订阅
         if await self.data_manager.update_subscription(
             sub_user, int(uid), filter_types, filter_regex
@@ -198,7 +240,7 @@ class Main(Star):
         }
         try:
             # 获取最新一条动态 (用于初始化 last_id)
-            dyn = await self.bili_client.get_latest_dynamics(int(uid))
+            dyn = parse_feed(await self.bili_client.get_latest_dynamics(int(uid)))
             if dyn:
                 parsed_results = await self.dynamic_listener._parse_and_filter_dynamics(dyn, _sub_data)
                 # 寻找列表里第一个出现的有效 ID (不管是哪种类型)
@@ -238,7 +280,7 @@ class Main(Star):
             render_data = await create_render_data()
             render_data["uid"] = uid
             render_data["name"] = "AstrBot"
-            render_data["avatar"] = await image_to_base64(LOGO_PATH)
+            render_data["avatar"] = await self.renderer.asset_src(LOGO_PATH)
             render_data["text"] = (
                 f"📣 订阅成功！<br>"
                 f"UP 主: {name} | 性别: {sex}"
@@ -248,7 +290,9 @@ class Main(Star):
             render_data["url"] = f"https://space.bilibili.com/{mid}"
             render_data["qrcode"] = await create_qrcode(render_data["url"])
             if self.rai:
-                img_path = await self.renderer.render_dynamic(render_data)
+                img_path = await self.renderer.render_dynamic(
+                    render_data, priority=PRIORITY_INTERACTIVE
+                )
                 if img_path:
                     yield event.chain_result([Image.fromFileSystem(img_path), Plain(render_data["url"])])
                     event.stop_event()
@@ -286,9 +330,12 @@ class Main(Star):
             yield event.plain_result("无订阅")
             return
         else:
+            profiles = await self.bili_client.get_profiles(
+                int(sub["uid"]) for sub in subs
+            )
             for idx, uid_sub_data in enumerate(subs):
                 uid = uid_sub_data["uid"]
-                info, _ = await self.bili_client.get_user_info(int(uid))
+                info = profiles.get(int(uid))
                 if not info:
                     ret += f"{idx + 1}. {uid} - 无法获取 UP 主信息\n"
                 else:
@@ -322,6 +369,33 @@ class Main(Star):
             yield event.plain_result("未找到指定的订阅")
         event.stop_event()
 
+    @filter.command("推送汇总", alias={"bili_digest"})
+    async def digest_mode(self, event: AstrMessageEvent):
+        """设置当前会话的汇总推送。用法: /推送汇总 [分钟数|关闭]"""
+        msg = event.message_str.strip()
+        parts = re.split(r"\s+", msg)
+        sub_user = event.unified_msg_origin
+        if len(parts) < 2:
+            window = self.data_manager.get_digest_window(sub_user)
+            status = f"每 {window} 分钟汇总推送一次" if window else "逐条推送"
+            yield event.plain_result(
+                f"当前会话: {status}\n用法: /推送汇总 <分钟数>，/推送汇总 关闭"
+            )
+            event.stop_event()
+            return
+        arg = parts[1]
+        if arg in ("关闭", "off", "0"):
+            await self.data_manager.set_digest_window(sub_user, 0)
+            yield event.plain_result("已关闭汇总推送，新动态将逐条推送。")
+        elif arg.isdigit():
+            await self.data_manager.set_digest_window(sub_user, int(arg))
+            yield event.plain_result(
+                f"已开启汇总推送，每 {arg} 分钟内的新动态将合并为一条消息推送。"
+            )
+        else:
+            yield event.plain_result("参数错误，请提供分钟数或“关闭”。")
+        event.stop_event()
+
     @filter.permission_type(PermissionType.ADMIN)
     @filter.command("全局删除", alias={"bili_global_del"})
     async def global_sub_del(self, event: AstrMessageEvent):
@@ -371,6 +445,10 @@ class Main(Star):
             else:
                 filter_regex.append(arg)
 
+        restored = await self.data_manager.resume_session(sid)
+        if restored:
+            yield event.plain_result(f"会话 {sid} 此前因推送失败被暂停，已恢复原有的 {restored} 条订阅。")
+
         if await self.data_manager.update_subscription(
             sid, int(uid), filter_types, filter_regex
         ):
@@ -389,7 +467,7 @@ class Main(Star):
                 "recent_ids": [],
             }
 
-            dyn = await self.bili_client.get_latest_dynamics(int(uid))
+            dyn = parse_feed(await self.bili_client.get_latest_dynamics(int(uid)))
             parsed_dyn = await self.dynamic_listener._parse_and_filter_dynamics(dyn, _sub_data)
             if parsed_dyn and parsed_dyn[0][1]:
                 dyn_id = parsed_dyn[0][1]
@@ -421,14 +499,90 @@ class Main(Star):
             event.stop_event()
             return
 
+        profiles = await self.bili_client.get_profiles(
+            int(sub["uid"]) for subs in all_subs.values() for sub in subs if sub.get("uid")
+        )
         for sub_user in all_subs:
             ret += f"- {sub_user}\n"
             for sub in all_subs[sub_user]:
                 uid = sub.get("uid")
-                ret += f"  - {uid}\n"
+                profile = profiles.get(int(uid)) if uid else None
+                if profile:
+                    ret += f"  - {uid} ({profile['name']})\n"
+                else:
+                    ret += f"  - {uid}\n"
         yield event.plain_result(ret)
         event.stop_event()
 
+    @filter.permission_type(PermissionType.ADMIN)
+    @filter.command("隔离列表", alias={"bili_quarantine_list"})
+    async def quarantine_list(self, event: AstrMessageEvent):
+        """管理员指令。查看因持续失败而被暂停轮询的 UP 主。"""
+        entries = self.dynamic_listener.uid_health.quarantined()
+        if not entries:
+            yield event.plain_result("当前没有被隔离的 UP 主。")
+            event.stop_event()
+            return
+        ret = "被隔离的 UP 主：\n"
+        for entry in entries:
+            ret += (
+                f"- {entry['uid']}：连续失败 {entry['failures']} 次，"
+                f"{entry['retry_in'] / 60:.0f} 分钟后重试\n  {entry['last_error']}\n"
+            )
+        ret += "解除隔离请使用: /解除隔离 <UID>"
+        yield event.plain_result(ret)
+        event.stop_event()
+
+    @filter.permission_type(PermissionType.ADMIN)
+    @filter.command("解除隔离", alias={"bili_quarantine_release"})
+    async def quarantine_release(self, event: AstrMessageEvent, uid: str):
+        """管理员指令。解除 UP 主的退避或隔离，下一轮轮询立即重新检查。用法: /解除隔离 <UID>"""
+        if self.dynamic_listener.uid_health.release(uid):
+            yield event.plain_result(f"已解除 UP 主 {uid} 的隔离，下一轮轮询将重新检查。")
+        else:
+            yield event.plain_result(f"UP 主 {uid} 当前未被隔离或退避。")
+        event.stop_event()
+
+    @filter.permission_type(PermissionType.ADMIN)
+    @filter.command("运行指标", alias={"bili_metrics"})
+    async def metrics_summary(self, event: AstrMessageEvent):
+        """管理员指令。查看轮询、接口、渲染与推送的耗时和计数。用法: /运行指标 [重置]"""
+        parts = re.split(r"\s+", event.message_str.strip())
+        if len(parts) > 1 and parts[1] in ("重置", "reset"):
+            metrics.reset()
+            yield event.plain_result("运行指标已重置。")
+        else:
+            yield event.plain_result(metrics.summary())
+        event.stop_event()
+
+    @filter.permission_type(PermissionType.ADMIN)
+    @filter.command("暂停列表", alias={"bili_suspended_list"})
+    async def suspended_list(self, event: AstrMessageEvent):
+        """管理员指令。查看因推送持续失败而被暂停的会话。"""
+        suspended = self.data_manager.get_suspended_sessions()
+        if not suspended:
+            yield event.plain_result("当前没有被暂停的会话。")
+            event.stop_event()
+            return
+        ret = "被暂停的会话：\n"
+        for sub_user, entry in suspended.items():
+            since = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.get("since", 0)))
+            ret += (
+                f"- {sub_user}（{len(entry.get('subs', []))} 条订阅，{since} 暂停）\n"
+                f"  {entry.get('reason', '')}\n"
+            )
+        ret += "恢复请使用: /恢复订阅 <SID>"
+        yield event.plain_result(ret)
+        event.stop_event()
+
+    @filter.permission_type(PermissionType.ADMIN)
+    @filter.command("恢复订阅", alias={"bili_restore_sub"})
+    async def restore_sub(self, event: AstrMessageEvent, sid: str):
+        """管理员指令。恢复被暂停会话的订阅。用法: /恢复订阅 <SID>"""
+        msg = await self.data_manager.restore_session(sid)
+        yield event.plain_result(msg)
+        event.stop_event()
+
     @filter.event_message_type(EventMessageType.ALL)
     async def parse_miniapp(self, event: AstrMessageEvent, *args, **kwargs):
         if self.enable_parse_miniapp:
@@ -480,7 +634,7 @@ class Main(Star):
         uid = parts[1]
         
         sub_user = event.unified_msg_origin
-        dyn = await self.bili_client.get_latest_dynamics(int(uid))
+        dyn = parse_feed(await self.bili_client.get_latest_dynamics(int(uid)))
         if dyn:
             parsed_results = await self.dynamic_listener._parse_and_filter_dynamics(
                 dyn,
@@ -500,9 +654,11 @@ class Main(Star):
                     break
             
             if render_data:
-                await self.dynamic_listener._handle_new_dynamic(sub_user, render_data)
+                await self.dynamic_listener._handle_new_dynamic(
+                    sub_user, render_data, priority=PRIORITY_INTERACTIVE
+                )
             else:
-                yield event.plain_result(f"未能解析有效动态。抓到 {len(dyn.get('items', []))} 条动态，但由于类型不符或被过滤，均无法显示。请查看后台日志。")
+                yield event.plain_result(f"未能解析有效动态。抓到 {len(dyn)} 条动态，但由于类型不符或被过滤，均无法显示。请查看后台日志。")
         else:
             yield event.plain_result("获取动态失败，请检查 UID 是否正确或网络是否正常。")
         event.stop_event()
@@ -549,3 +705,6 @@ class Main(Star):
                 logger.error(
                     f"Error awaiting cancellation of dynamic_listener task: {e}"
                 )
+        if self.asset_server:
+            await self.asset_server.stop()
+        await self.bili_client.close()
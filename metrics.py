@@ -0,0 +1,114 @@
+import time
+import bisect
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+# 延迟直方图各桶的上界（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class Histogram:
+    """固定分桶的延迟直方图，分位数取所在桶的上界（不超过最大值）。"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= target:
+                return min(LATENCY_BUCKETS[i], self.max) if i < len(LATENCY_BUCKETS) else self.max
+        return self.max
+
+
+class Metrics:
+    """
+    插件运行指标：计数器、延迟直方图，以及在输出摘要时才读取的即时状态（队列长度、缓存命中率等）。
+    名称以点分隔，如 api.space、render.fail；同一前缀下的 ok / fail 计数会合并显示失败率。
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self._gauges: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self.started = time.monotonic()
+
+    def inc(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = Histogram()
+        hist.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        """记录代码块的耗时，异常退出同样计入。"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def register_gauge(self, name: str, fn: Callable[[], Dict[str, Any]]):
+        """注册即时状态，同名注册会覆盖（插件重载时指向新的对象）。"""
+        self._gauges[name] = fn
+
+    def reset(self):
+        self.counters.clear()
+        self.histograms.clear()
+        self.started = time.monotonic()
+
+    def summary(self) -> str:
+        lines: List[str] = [f"统计时长: {(time.monotonic() - self.started) / 3600:.1f} 小时"]
+
+        if self.histograms:
+            lines.append("【耗时】")
+            for name in sorted(self.histograms):
+                h = self.histograms[name]
+                lines.append(
+                    f"{name}: {h.count} 次, 平均 {h.mean:.2f}s, "
+                    f"p50≤{h.quantile(0.5):.2f}s, p95≤{h.quantile(0.95):.2f}s, 最大 {h.max:.2f}s"
+                )
+
+        if self.counters:
+            lines.append("【计数】")
+            counters = dict(self.counters)
+            for prefix in sorted({k.rsplit(".", 1)[0] for k in counters if k.endswith(".ok")}):
+                ok = counters.pop(f"{prefix}.ok", 0)
+                fail = counters.pop(f"{prefix}.fail", 0)
+                rate = fail / (ok + fail) if ok + fail else 0.0
+                lines.append(f"{prefix}: 成功 {ok}, 失败 {fail} (失败率 {rate:.1%})")
+            for name in sorted(counters):
+                lines.append(f"{name}: {counters[name]}")
+
+        if self._gauges:
+            lines.append("【当前状态】")
+            for name in sorted(self._gauges):
+                try:
+                    values = self._gauges[name]()
+                except Exception as e:
+                    values = {"error": e}
+                lines.append(f"{name}: " + ", ".join(f"{k}={v}" for k, v in values.items()))
+        return "\n".join(lines)
+
+
+metrics = Metrics()
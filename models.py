@@ -0,0 +1,238 @@
+from enum import Enum
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class DynamicType(str, Enum):
+    FORWARD = "DYNAMIC_TYPE_FORWARD"
+    DRAW = "DYNAMIC_TYPE_DRAW"
+    WORD = "DYNAMIC_TYPE_WORD"
+    AV = "DYNAMIC_TYPE_AV"
+    ARTICLE = "DYNAMIC_TYPE_ARTICLE"
+    LIVE_RCMD = "DYNAMIC_TYPE_LIVE_RCMD"
+    UNKNOWN = "UNKNOWN"
+
+    @classmethod
+    def _missing_(cls, value):
+        return cls.UNKNOWN
+
+
+# 渲染富文本时用到的节点字段，其余字段在解析时丢弃
+_RICH_NODE_KEYS = ("type", "text", "orig_text", "jump_url", "rid")
+
+
+@dataclass(slots=True)
+class Author:
+    mid: int = 0
+    name: str = ""
+    face: str = ""
+    pendant: str = ""
+
+
+@dataclass(slots=True)
+class ParsedDynamic:
+    """
+    解析后的单条动态，只保留插件用到的字段。
+    text/rich_nodes 为正文（视频与转发为 desc，图文与专栏为 opus.summary）。
+    """
+
+    id: int
+    type: DynamicType
+    raw_type: str
+    author: Author
+    text: str = ""
+    rich_nodes: Tuple[Dict[str, Any], ...] = ()
+    topic: Optional[Dict[str, str]] = None
+    title: str = ""
+    pics: Tuple[str, ...] = ()
+    cover: str = ""
+    bvid: str = ""
+    jump_url: str = ""
+    orig: Optional["ParsedDynamic"] = None
+    pub_ts: int = 0
+    blocked: bool = False
+    pinned: bool = False
+
+    @property
+    def id_str(self) -> str:
+        return str(self.id) if self.id else ""
+
+    @property
+    def is_lottery(self) -> bool:
+        return bool(self.rich_nodes) and self.rich_nodes[0].get("text") == "互动抽奖"
+
+    @property
+    def rich_summary(self) -> Dict[str, Any]:
+        """供富文本渲染使用的正文结构。"""
+        return {"text": self.text, "rich_text_nodes": list(self.rich_nodes)}
+
+
+def _trim_node(node: Dict[str, Any]) -> Dict[str, Any]:
+    trimmed = {k: node[k] for k in _RICH_NODE_KEYS if node.get(k) is not None}
+    emoji = node.get("emoji")
+    if emoji:
+        trimmed["emoji"] = {"icon_url": emoji.get("icon_url") or emoji.get("gif_url")}
+    return trimmed
+
+
+def _to_int(value: Any) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def parse_dynamic(item: Dict[str, Any]) -> ParsedDynamic:
+    """将接口返回的单条动态转换为 ParsedDynamic。"""
+    modules = item.get("modules") or {}
+    author_module = modules.get("module_author") or {}
+    module_dynamic = modules.get("module_dynamic") or {}
+    major = module_dynamic.get("major") or {}
+    tag = modules.get("module_tag") or {}
+    raw_type = item.get("type") or ""
+
+    dyn = ParsedDynamic(
+        id=_to_int(item.get("id_str")),
+        type=DynamicType(raw_type),
+        raw_type=raw_type,
+        author=Author(
+            mid=_to_int(author_module.get("mid")),
+            name=author_module.get("name") or "",
+            face=author_module.get("face") or "",
+            pendant=(author_module.get("pendant") or {}).get("image") or "",
+        ),
+        pub_ts=_to_int(author_module.get("pub_ts")),
+        pinned=tag.get("text") == "置顶",
+        blocked=major.get("type") == "MAJOR_TYPE_BLOCKED",
+    )
+
+    topic = module_dynamic.get("topic")
+    if topic:
+        dyn.topic = {"name": topic.get("name", ""), "jump_url": topic.get("jump_url", "")}
+
+    opus = major.get("opus")
+    if opus:
+        summary = opus.get("summary") or {}
+        dyn.text = summary.get("text") or ""
+        dyn.rich_nodes = tuple(_trim_node(n) for n in summary.get("rich_text_nodes") or [])
+        dyn.title = opus.get("title") or ""
+        dyn.pics = tuple(p["url"] for p in opus.get("pics") or [] if p.get("url"))
+        dyn.jump_url = opus.get("jump_url") or ""
+    else:
+        desc = module_dynamic.get("desc") or {}
+        dyn.text = desc.get("text") or ""
+        dyn.rich_nodes = tuple(_trim_node(n) for n in desc.get("rich_text_nodes") or [])
+
+    archive = major.get("archive")
+    if archive:
+        dyn.title = archive.get("title") or ""
+        dyn.bvid = archive.get("bvid") or ""
+        dyn.cover = archive.get("cover") or ""
+
+    orig = item.get("orig")
+    if orig and raw_type == DynamicType.FORWARD.value:
+        dyn.orig = parse_dynamic(orig)
+    return dyn
+
+
+def parse_feed(feed: Optional[Dict[str, Any]]) -> List[ParsedDynamic]:
+    """解析一页动态列表，跳过缺少 modules 的条目。"""
+    if not feed:
+        return []
+    return [parse_dynamic(item) for item in feed.get("items") or [] if "modules" in item]
+
+
+def parse_video(item: Dict[str, Any]) -> ParsedDynamic:
+    """将投稿视频列表中的一项转换为视频类型的 ParsedDynamic（无动态 ID）。"""
+    return ParsedDynamic(
+        id=0,
+        type=DynamicType.AV,
+        raw_type=DynamicType.AV.value,
+        author=Author(mid=_to_int(item.get("mid")), name=item.get("author") or ""),
+        title=item.get("title") or "",
+        cover=item.get("pic") or "",
+        bvid=item.get("bvid") or "",
+        pub_ts=_to_int(item.get("created")),
+    )
+
+
+def _trim_text(text_module: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not text_module:
+        return None
+    return {
+        "text": text_module.get("text") or "",
+        "rich_text_nodes": [_trim_node(n) for n in text_module.get("rich_text_nodes") or []],
+    }
+
+
+def trim_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    仅保留 parse_dynamic 读取的字段，丢弃 module_interaction、module_more、module_stat、
+    additional 等插件不使用的部分。结构与原始数据一致。
+    """
+    modules = item.get("modules") or {}
+    author = modules.get("module_author") or {}
+    module_dynamic = modules.get("module_dynamic") or {}
+    major = module_dynamic.get("major") or {}
+
+    trimmed_major: Dict[str, Any] = {"type": major.get("type")}
+    opus = major.get("opus")
+    if opus:
+        trimmed_major["opus"] = {
+            "summary": _trim_text(opus.get("summary")),
+            "jump_url": opus.get("jump_url"),
+            "title": opus.get("title"),
+            "pics": [{"url": p.get("url")} for p in opus.get("pics") or []],
+        }
+    archive = major.get("archive")
+    if archive:
+        trimmed_major["archive"] = {
+            "title": archive.get("title"),
+            "bvid": archive.get("bvid"),
+            "cover": archive.get("cover"),
+        }
+
+    trimmed_modules: Dict[str, Any] = {
+        "module_author": {
+            "mid": author.get("mid"),
+            "name": author.get("name"),
+            "face": author.get("face"),
+            "pendant": {"image": (author.get("pendant") or {}).get("image")},
+            "pub_ts": author.get("pub_ts"),
+        },
+        "module_dynamic": {
+            "desc": _trim_text(module_dynamic.get("desc")),
+            "topic": module_dynamic.get("topic"),
+            "major": trimmed_major,
+        },
+    }
+    tag = modules.get("module_tag")
+    if tag:
+        trimmed_modules["module_tag"] = {"text": tag.get("text")}
+
+    trimmed = {
+        "id_str": item.get("id_str"),
+        "type": item.get("type"),
+        "modules": trimmed_modules,
+    }
+    orig = item.get("orig")
+    if orig and "modules" in orig:
+        trimmed["orig"] = trim_item(orig)
+    return trimmed
+
+
+def trim_feed(feed: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """精简一页动态列表，返回与接口相同结构的字典。"""
+    feed = feed or {}
+    return {
+        "items": [trim_item(item) for item in feed.get("items") or [] if "modules" in item],
+        "offset": feed.get("offset", ""),
+        "has_more": feed.get("has_more", False),
+    }
+
+
+def trim_video_list(data: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """精简投稿视频列表接口的返回值，只保留 parse_video 读取的字段。"""
+    vlist = ((data or {}).get("list") or {}).get("vlist") or []
+    keys = ("mid", "author", "title", "pic", "bvid", "created")
+    return [{k: item.get(k) for k in keys} for item in vlist]
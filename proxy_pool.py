@@ -0,0 +1,166 @@
+import time
+import asyncio
+import hashlib
+import aiohttp
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List
+from astrbot.api import logger
+from .constant import (
+    PROXY_EWMA_ALPHA,
+    PROXY_EJECT_ERROR_RATE,
+    PROXY_MIN_SAMPLES,
+    PROXY_EJECT_TIME,
+    PROXY_MAX_EJECT_TIME,
+    PROXY_BURST,
+)
+
+try:
+    from aiohttp_socks import ProxyConnector
+except ImportError:
+    ProxyConnector = None
+
+SOCKS_SCHEMES = ("socks4://", "socks4a://", "socks5://", "socks5h://")
+
+
+class TokenBucket:
+    """令牌桶限速：每秒补充 rate 个令牌，最多累积 capacity 个。"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """取一个令牌，不足时等待补充。等待者按到达顺序依次获得令牌。"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+@dataclass
+class ProxyEndpoint:
+    """代理出口及其健康评分。latency 与 error_rate 均为指数加权移动平均。"""
+
+    url: str
+    bucket: TokenBucket
+    latency: float = 0.0
+    error_rate: float = 0.0
+    samples: int = 0
+    ejected_until: float = 0.0
+    ejections: int = 0
+    total_requests: int = 0
+    total_errors: int = 0
+    session: Any = field(default=None, repr=False)
+
+    @property
+    def is_socks(self) -> bool:
+        return self.url.startswith(SOCKS_SCHEMES)
+
+    def available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+
+class ProxyPool:
+    """
+    出站代理池。按 key（通常为 UID）做一致性哈希，同一 UP 主的请求固定走同一出口；
+    出口错误率过高时暂时剔除，其负责的 key 自动分散到其余出口，冷却结束后重新加入。
+    每个出口有独立的令牌桶限速。
+    """
+
+    def __init__(self, urls: List[str], rate: float, burst: float = PROXY_BURST):
+        self.endpoints: List[ProxyEndpoint] = []
+        for url in dict.fromkeys(u.strip() for u in urls if u and u.strip()):
+            if url.startswith(SOCKS_SCHEMES) and ProxyConnector is None:
+                logger.warning(f"未安装 aiohttp_socks，已忽略 SOCKS 代理 {url}")
+                continue
+            self.endpoints.append(ProxyEndpoint(url, TokenBucket(rate, burst)))
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    @staticmethod
+    def _weight(key: Hashable, endpoint: ProxyEndpoint) -> int:
+        digest = hashlib.md5(f"{key}|{endpoint.url}".encode()).digest()
+        return int.from_bytes(digest[:8], "big")
+
+    def select(self, key: Hashable) -> ProxyEndpoint:
+        """
+        最高随机权重（rendezvous）哈希：出口增减时只有落在该出口上的 key 会迁移。
+        全部出口都被剔除时，选择最早恢复的一个。
+        """
+        now = time.monotonic()
+        candidates = [e for e in self.endpoints if e.available(now)]
+        if not candidates:
+            return min(self.endpoints, key=lambda e: e.ejected_until)
+        return max(candidates, key=lambda e: self._weight(key, e))
+
+    def record(self, endpoint: ProxyEndpoint, latency: float, ok: bool):
+        """记录一次请求结果并更新健康评分，错误率超过阈值时剔除该出口。"""
+        alpha = PROXY_EWMA_ALPHA
+        endpoint.total_requests += 1
+        endpoint.samples += 1
+        endpoint.latency = (
+            latency if endpoint.samples == 1 else (1 - alpha) * endpoint.latency + alpha * latency
+        )
+        endpoint.error_rate = (1 - alpha) * endpoint.error_rate + alpha * (0.0 if ok else 1.0)
+        if ok:
+            if endpoint.ejections and endpoint.error_rate < PROXY_EJECT_ERROR_RATE / 2:
+                endpoint.ejections = 0
+            return
+        endpoint.total_errors += 1
+        if (
+            endpoint.samples >= PROXY_MIN_SAMPLES
+            and endpoint.error_rate >= PROXY_EJECT_ERROR_RATE
+        ):
+            self._eject(endpoint)
+
+    def _eject(self, endpoint: ProxyEndpoint):
+        duration = min(PROXY_MAX_EJECT_TIME, PROXY_EJECT_TIME * 2**endpoint.ejections)
+        endpoint.ejections += 1
+        endpoint.ejected_until = time.monotonic() + duration
+        # 恢复后重新积累样本，避免刚加入就因历史错误率再次被剔除
+        endpoint.samples = 0
+        endpoint.error_rate = PROXY_EJECT_ERROR_RATE / 2
+        logger.warning(f"代理 {endpoint.url} 错误率过高，暂停使用 {duration:.0f} 秒")
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "url": e.url,
+                "available": e.available(now),
+                "retry_in": max(0.0, e.ejected_until - now),
+                "latency": round(e.latency, 3),
+                "error_rate": round(e.error_rate, 3),
+                "requests": e.total_requests,
+                "errors": e.total_errors,
+            }
+            for e in self.endpoints
+        ]
+
+    async def session_for(self, endpoint: ProxyEndpoint):
+        """SOCKS 出口需要独立的连接器与会话，首次使用时创建。"""
+        if endpoint.session is None or endpoint.session.closed:
+            endpoint.session = aiohttp.ClientSession(
+                connector=ProxyConnector.from_url(endpoint.url),
+                cookie_jar=aiohttp.DummyCookieJar(),
+            )
+        return endpoint.session
+
+    async def close(self):
+        for endpoint in self.endpoints:
+            if endpoint.session and not endpoint.session.closed:
+                await endpoint.session.close()
+            endpoint.session = None
@@ -0,0 +1,104 @@
+import time
+import random
+from typing import Any, Dict, Optional
+from astrbot.api import logger
+from .constant import (
+    RETRY_DELAY,
+    RETRY_MAX_DELAY,
+    RENDER_BREAKER_THRESHOLD,
+    RENDER_BREAKER_COOLDOWN,
+    RENDER_BREAKER_MAX_COOLDOWN,
+)
+
+
+def backoff_delay(attempt: int, base: float = RETRY_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    """第 attempt 次失败后的等待时间：指数退避，叠加随机抖动避免多个任务同时重试。"""
+    delay = min(cap, base * (2 ** (attempt - 1)))
+    return random.uniform(delay / 2, delay)
+
+
+class RenderHealth:
+    """
+    渲染服务健康状态与熔断器。
+    连续失败达到阈值后熔断，期间渲染直接走纯文本回退；冷却结束后放行一次探测请求，
+    成功则恢复，失败则以加倍的冷却时间重新熔断。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = RENDER_BREAKER_THRESHOLD,
+        cooldown: float = RENDER_BREAKER_COOLDOWN,
+        max_cooldown: float = RENDER_BREAKER_MAX_COOLDOWN,
+    ):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.cooldown = cooldown
+        self.open_until = 0.0
+        self.last_error: Optional[str] = None
+        self.total_success = 0
+        self.total_failure = 0
+        self.total_rejected = 0
+
+    @property
+    def available(self) -> bool:
+        """渲染服务当前是否可能可用（熔断中且未到探测时间时为 False）。"""
+        return self.state != self.OPEN or time.monotonic() >= self.open_until
+
+    def allow_request(self) -> bool:
+        """判断是否放行一次渲染请求。半开状态下只放行一个探测请求。"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() >= self.open_until:
+            self.state = self.HALF_OPEN
+            logger.info("渲染服务熔断冷却结束，发送探测请求")
+            return True
+        self.total_rejected += 1
+        return False
+
+    def record_success(self):
+        self.total_success += 1
+        if self.state != self.CLOSED:
+            logger.info("渲染服务已恢复")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.cooldown = self.base_cooldown
+
+    def record_failure(self, error: Optional[str] = None):
+        self.total_failure += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.state == self.HALF_OPEN:
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            self._open()
+        elif (
+            self.state == self.CLOSED
+            and self.consecutive_failures >= self.failure_threshold
+        ):
+            self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.open_until = time.monotonic() + self.cooldown
+        logger.warning(
+            f"渲染服务连续失败 {self.consecutive_failures} 次，熔断 {self.cooldown:.0f} 秒，期间将直接发送纯文本"
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in": max(0.0, self.open_until - time.monotonic())
+            if self.state == self.OPEN
+            else 0.0,
+            "success": self.total_success,
+            "failure": self.total_failure,
+            "rejected": self.total_rejected,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,81 @@
+import heapq
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+# 优先级，数值越小越优先
+PRIORITY_INTERACTIVE = 0
+PRIORITY_LIVE = 1  # 开播 / 下播通知，时效性高于动态推送
+PRIORITY_BACKGROUND = 2
+
+_LANE_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_LIVE: "live",
+    PRIORITY_BACKGROUND: "background",
+}
+
+
+class DeadlineExceeded(Exception):
+    """渲染任务在截止时间前未能获得执行槽位。"""
+
+
+class RenderScheduler:
+    """
+    渲染调度器：限制同时发往渲染服务的请求数，并按优先级分配空闲槽位。
+    交互请求（用户发链接、指令）总是先于后台推送获得槽位；
+    后台任务可设置排队截止时间，超时后放弃渲染，由调用方降级为纯文本。
+    """
+
+    def __init__(self, max_concurrency: int = 2):
+        self.max_concurrency = max(1, max_concurrency)
+        self._active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self.expired = 0
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_BACKGROUND, timeout: Optional[float] = None):
+        """
+        获取一个渲染槽位。timeout 为最长排队时间，超时抛出 DeadlineExceeded。
+        """
+        await self._acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: int, timeout: Optional[float]):
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            self.expired += 1
+            raise DeadlineExceeded(f"排队超过 {timeout} 秒")
+        except asyncio.CancelledError:
+            # 已被分配槽位但调用方取消，归还槽位
+            if fut.done() and not fut.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        self._active -= 1
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if fut.done():
+                continue
+            self._active += 1
+            fut.set_result(None)
+            break
+
+    def snapshot(self) -> Dict[str, int]:
+        depths = {name: 0 for name in _LANE_NAMES.values()}
+        for priority, _, fut in self._waiters:
+            if not fut.done():
+                name = _LANE_NAMES.get(priority, str(priority))
+                depths[name] = depths.get(name, 0) + 1
+        return {"active": self._active, "expired": self.expired, **depths}
@@ -1,20 +1,50 @@
 import os
+import time
 import asyncio
 from .utils import *
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from astrbot.api import logger
 from astrbot.api.all import Star
+from .asset_server import AssetServer
+from .models import DynamicType, ParsedDynamic
+from .render_health import RenderHealth, backoff_delay
+from .render_scheduler import RenderScheduler, DeadlineExceeded, PRIORITY_BACKGROUND
+from .image_pipeline import split_batch_render_output
+from .metrics import metrics
+from .template_builder import (
+    BuiltTemplate,
+    build_template,
+    as_static_template,
+    compose_batch_document,
+)
 from .constant import (
     LOGO_PATH,
     BANNER_PATH,
     MAX_ATTEMPTS,
-    RETRY_DELAY,
+    RENDER_BACKGROUND_TIMEOUT,
+    BATCH_RENDER_MIN,
+    BATCH_RENDER_MAX,
     CARD_TEMPLATES,
     DEFAULT_TEMPLATE,
     get_template_path,
 )
 
 
+# 持久化的渲染数据中本地资源的占位符前缀
+ASSET_REF_PREFIX = "asset-ref:"
+
+
+def _replace_strings(value: Any, mapping: Dict[str, str]) -> Any:
+    """递归替换渲染数据中的字符串（含嵌套的转发内容与列表），不修改原数据。"""
+    if isinstance(value, str):
+        return mapping.get(value, value)
+    if isinstance(value, dict):
+        return {k: _replace_strings(v, mapping) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_replace_strings(v, mapping) for v in value]
+    return value
+
+
 def load_template(style: str) -> str:
     """加载指定样式的模板内容"""
     path = get_template_path(style)
@@ -27,149 +57,311 @@ class Renderer:
     负责将动态数据渲染成图片。
     """
 
-    def __init__(self, star_instance: Star, rai: bool, style: str = DEFAULT_TEMPLATE):
+    def __init__(
+        self,
+        star_instance: Star,
+        rai: bool,
+        style: str = DEFAULT_TEMPLATE,
+        asset_server: Optional[AssetServer] = None,
+        prerender: bool = False,
+        max_concurrency: int = 2,
+    ):
         """
         初始化渲染器。
+        asset_server: 可选的本地资源服务器，运行时以 URL 引用资源而非内联 base64
+        prerender: 是否在本地完成模板渲染，仅将最终 HTML 交给渲染端
+        max_concurrency: 同时发往渲染服务的最大请求数
         """
         self.star = star_instance
         self.rai = rai
         self.style = style
-        # 预加载所有模板
-        self._templates: Dict[str, str] = {}
+        self.asset_server = asset_server
+        self.prerender = prerender
+        self.health = RenderHealth()
+        self.scheduler = RenderScheduler(max_concurrency)
+        metrics.register_gauge(
+            "render_queue", lambda: {**self.scheduler.snapshot(), "health": self.health.state}
+        )
+        # 预加载并构建所有模板
+        self._templates: Dict[str, BuiltTemplate] = {}
         self._load_all_templates()
 
     def _load_all_templates(self):
-        """预加载所有注册的模板"""
+        """预加载所有注册的模板，并执行压缩与本地编译"""
         for template_id in CARD_TEMPLATES:
             try:
-                self._templates[template_id] = load_template(template_id)
+                raw = load_template(template_id)
             except Exception as e:
                 logger.warning(f"加载模板 {template_id} 失败: {e}")
+                continue
+            try:
+                built = build_template(template_id, raw)
+            except Exception as e:
+                logger.warning(f"构建模板 {template_id} 失败，将使用原始模板: {e}")
+                built = BuiltTemplate(
+                    style=template_id,
+                    source=raw,
+                    compiled=None,
+                )
+            self._templates[template_id] = built
 
     def reload_templates(self):
         """重新加载所有模板（用于热更新）"""
         self._templates.clear()
         self._load_all_templates()
 
-    def get_template(self, style: str = None) -> str:
-        """获取指定样式的模板内容"""
+    def _get_built(self, style: str = None) -> Optional[BuiltTemplate]:
         target_style = style or self.style
         if target_style not in self._templates:
             target_style = DEFAULT_TEMPLATE
-        return self._templates.get(target_style, "")
+        return self._templates.get(target_style)
+
+    def get_template(self, style: str = None) -> str:
+        """获取指定样式的模板内容（已压缩）"""
+        built = self._get_built(style)
+        return built.source if built else ""
+
+    def render_html(self, render_data: Dict[str, Any], style: str = None) -> Optional[str]:
+        """在本地将渲染数据填入模板，返回最终 HTML。模板不可用时返回 None。"""
+        built = self._get_built(style)
+        if not built or not built.compiled:
+            return None
+        return built.render(render_data)
+
+    async def asset_src(self, path: str) -> str:
+        """获取本地资源的引用地址：资源服务器可用时为 URL，否则为 base64 Data URI。"""
+        if self.asset_server:
+            url = self.asset_server.asset_url(path)
+            if url:
+                return url
+        return await image_to_base64(path)
+
+    async def detach_assets(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        将渲染数据中引用的本地资源（banner、logo）替换为占位符，便于写入数据文件；
+        未启用资源服务器时它们是体积很大的 base64。attach_assets 负责还原。
+        """
+        refs = {
+            await self.asset_src(path): ASSET_REF_PREFIX + os.path.basename(path)
+            for path in (BANNER_PATH, LOGO_PATH)
+        }
+        return [_replace_strings(d, refs) for d in items]
+
+    async def attach_assets(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """将 detach_assets 留下的占位符还原为当前可用的资源地址。"""
+        refs = {
+            ASSET_REF_PREFIX + os.path.basename(path): await self.asset_src(path)
+            for path in (BANNER_PATH, LOGO_PATH)
+        }
+        return [_replace_strings(d, refs) for d in items]
+
+    def _localize_images(self, render_data: Dict[str, Any]) -> Dict[str, Any]:
+        """将渲染数据中的 B 站图片替换为本地代理地址，不修改原字典。"""
+        if not self.asset_server or not self.asset_server.running:
+            return render_data
+        proxy = self.asset_server.image_url
+        data = dict(render_data)
+        for key in ("avatar", "pendant"):
+            if data.get(key):
+                data[key] = proxy(data[key])
+        data["image_urls"] = [proxy(u) for u in data.get("image_urls") or []]
+        if data.get("forward"):
+            data["forward"] = self._localize_images(data["forward"])
+        return data
 
-    async def render_dynamic(self, render_data: Dict[str, Any], style: str = None):
+    async def render_dynamic(
+        self,
+        render_data: Dict[str, Any],
+        style: str = None,
+        priority: int = PRIORITY_BACKGROUND,
+        timeout: Optional[float] = None,
+    ):
         """
         将渲染数据字典渲染成最终图片。
         这是该类的主要入口方法。
+        priority: 调度优先级，用户触发的渲染应使用 PRIORITY_INTERACTIVE
+        timeout: 最长排队时间，后台任务默认为 RENDER_BACKGROUND_TIMEOUT，超时返回 None
         """
-        # options = {"full_page": True, "type": "png", "quality": None, "scale": "device"}
-        options = {"full_page": True, "type": "jpeg", "quality": 95, "scale": "device"}
+        if not self.health.available:
+            return None
+        if timeout is None and priority == PRIORITY_BACKGROUND:
+            timeout = RENDER_BACKGROUND_TIMEOUT
+        try:
+            async with self.scheduler.slot(priority, timeout):
+                return await self._render(render_data, style)
+        except DeadlineExceeded as e:
+            logger.warning(f"后台渲染任务{e}，放弃渲染")
+            return None
 
-        tmpl = self.get_template(style)
+    async def render_many(
+        self,
+        render_data_list: List[Dict[str, Any]],
+        style: str = None,
+        priority: int = PRIORITY_BACKGROUND,
+    ) -> List[Optional[str]]:
+        """
+        渲染多张卡片。数量达到 BATCH_RENDER_MIN 时合并到一个页面中一次渲染再切分，
+        批量渲染失败时逐张渲染。返回与输入顺序一致的图片路径列表（失败项为 None）。
+        """
+        results: List[Optional[str]] = []
+        for start in range(0, len(render_data_list), BATCH_RENDER_MAX):
+            chunk = render_data_list[start : start + BATCH_RENDER_MAX]
+            paths = None
+            if len(chunk) >= BATCH_RENDER_MIN and self.health.available:
+                try:
+                    async with self.scheduler.slot(priority, RENDER_BACKGROUND_TIMEOUT):
+                        paths = await self._render_batch(chunk, style)
+                except DeadlineExceeded as e:
+                    logger.warning(f"批量渲染任务{e}，改为逐张渲染")
+            if paths is None:
+                paths = [
+                    await self.render_dynamic(d, style, priority=priority) for d in chunk
+                ]
+            results.extend(paths)
+        return results
 
-        for attempt in range(1, MAX_ATTEMPTS + 1):
-            render_output = None
+    async def _render_batch(
+        self, render_data_list: List[Dict[str, Any]], style: str = None
+    ) -> Optional[List[str]]:
+        """在一个页面中渲染多张卡片，并按分隔条切回单张。"""
+        try:
+            htmls = [
+                self.render_html(self._localize_images(d), style)
+                for d in render_data_list
+            ]
+        except Exception as e:
+            logger.warning(f"批量渲染预渲染失败: {e}")
+            return None
+        if not all(htmls):
+            return None
+        page = compose_batch_document(htmls)
+        output = await self._html_render(as_static_template(page))
+        if not output:
+            return None
+        paths = await split_batch_render_output(output, len(render_data_list))
+        if paths:
+            logger.info(f"批量渲染 {len(paths)} 张卡片完成")
+        return paths
+
+    async def _render(self, render_data: Dict[str, Any], style: str = None):
+        tmpl = self.get_template(style)
+        render_data = self._localize_images(render_data)
+        if self.prerender:
             try:
-                render_output = await self.star.html_render(
-                    tmpl=tmpl,
-                    data=render_data,
-                    return_url=False,
-                    options=options,
-                )
-                if (
-                    render_output
-                    and os.path.exists(render_output)
-                    and os.path.getsize(render_output) > 4096
-                ):
-                    return render_output  # 成功，直接返回渲染结果
+                html = self.render_html(render_data, style)
+                if html:
+                    tmpl, render_data = as_static_template(html), {}
             except Exception as e:
-                logger.error(f"渲染图片失败 (尝试次数: {attempt}): {e}")
+                logger.warning(f"本地预渲染失败，交由渲染端处理: {e}")
+        return await self._html_render(tmpl, render_data)
+
+    async def _html_render(self, tmpl: str, render_data: Dict[str, Any] = None):
+        """调用渲染服务，按健康状态决定是否放行及重试次数。"""
+        # options = {"full_page": True, "type": "png", "quality": None, "scale": "device"}
+        options = {"full_page": True, "type": "jpeg", "quality": 95, "scale": "device"}
+        render_data = render_data or {}
+
+        if not self.health.allow_request():
+            logger.debug("渲染服务处于熔断状态，跳过渲染")
+            metrics.inc("render.rejected")
+            return None
+        # 半开状态只发送一次探测请求，不做重试
+        probe = self.health.state == RenderHealth.HALF_OPEN
+        max_attempts = 1 if probe else MAX_ATTEMPTS
+        settled = False
+        try:
+            for attempt in range(1, max_attempts + 1):
+                render_output = None
+                error = None
+                start = time.perf_counter()
+                try:
+                    render_output = await self.star.html_render(
+                        tmpl=tmpl,
+                        data=render_data,
+                        return_url=False,
+                        options=options,
+                    )
+                    if (
+                        render_output
+                        and os.path.exists(render_output)
+                        and os.path.getsize(render_output) > 4096
+                    ):
+                        self.health.record_success()
+                        settled = True
+                        metrics.observe("render", time.perf_counter() - start)
+                        metrics.inc("render.ok")
+                        return render_output  # 成功，直接返回渲染结果
+                    error = "渲染结果为空"
+                except Exception as e:
+                    error = str(e)
+                    logger.error(f"渲染图片失败 (尝试次数: {attempt}): {e}")
 
-            if attempt < MAX_ATTEMPTS:
-                await asyncio.sleep(RETRY_DELAY)
+                metrics.observe("render", time.perf_counter() - start)
+                metrics.inc("render.fail")
+                self.health.record_failure(error)
+                settled = True
+                if attempt < max_attempts and self.health.state == RenderHealth.CLOSED:
+                    await asyncio.sleep(backoff_delay(attempt))
+                else:
+                    break
 
-        return None  # 所有尝试都失败
+            return None  # 所有尝试都失败
+        finally:
+            # 探测被取消或抛出未预期的异常时也要计为失败，否则熔断器会一直停在半开状态
+            if probe and not settled:
+                self.health.record_failure("探测请求被中断")
 
     async def build_render_data(
-        self, item: Dict, is_forward: bool = False
+        self, dyn: ParsedDynamic, is_forward: bool = False
     ) -> Dict[str, Any]:
         """
-        根据从B站API获取的单个动态项目，构建用于渲染的字典。
+        根据解析后的单条动态，构建用于渲染的字典。
         is_forward: 标记是否正在处理转发动态
         """
         render_data = await create_render_data()
-        render_data["banner"] = await image_to_base64(BANNER_PATH)
+        render_data["banner"] = await self.asset_src(BANNER_PATH)
         # 用户名称、头像、挂件
-        author_module = item.get("modules", {}).get("module_author", {})
-        render_data["name"] = author_module.get("name")
-        render_data["avatar"] = author_module.get("face")
-        render_data["pendant"] = author_module.get("pendant", {}).get("image")
-        render_data["type"] = item.get("type")
+        render_data["name"] = dyn.author.name
+        render_data["avatar"] = dyn.author.face
+        render_data["pendant"] = dyn.author.pendant
+        render_data["type"] = dyn.raw_type
 
         # 根据不同动态类型填充数据
-        if item.get("type") == "DYNAMIC_TYPE_AV":
+        if dyn.type == DynamicType.AV:
             # 视频动态
-            archive = item["modules"]["module_dynamic"]["major"]["archive"]
-            title = archive["title"]
-            bv = archive["bvid"]
-            cover_url = archive["cover"]
-
-            try:
-                content_text = item["modules"]["module_dynamic"]["desc"]["text"]
-            except (TypeError, KeyError):
-                content_text = None  # 或默认值
-
-            if content_text:
-                rich_text = await parse_rich_text(
-                    item["modules"]["module_dynamic"]["desc"],
-                    item["modules"]["module_dynamic"]["topic"],
-                )
+            if dyn.text:
+                rich_text = await parse_rich_text(dyn.rich_summary, dyn.topic)
                 render_data["text"] = f"投稿了新视频<br>{rich_text}"
             else:
                 render_data["text"] = f"投稿了新视频<br>"
-            render_data["title"] = title
-            render_data["image_urls"] = [cover_url]
+            render_data["title"] = dyn.title
+            render_data["image_urls"] = [dyn.cover]
             if not is_forward:
-                url = f"https://www.bilibili.com/video/{bv}"
+                url = f"https://www.bilibili.com/video/{dyn.bvid}"
                 render_data["qrcode"] = await create_qrcode(url)
                 render_data["url"] = url
-            # logger.info(f"返回视频动态 {dyn_id}。")
             return render_data
-        elif item.get("type") in (
-            "DYNAMIC_TYPE_DRAW",
-            "DYNAMIC_TYPE_WORD",
-            "DYNAMIC_TYPE_ARTICLE",
+        elif dyn.type in (
+            DynamicType.DRAW,
+            DynamicType.WORD,
+            DynamicType.ARTICLE,
         ):
             # 图文动态
-            opus = item["modules"]["module_dynamic"]["major"]["opus"]
-            summary = opus["summary"]
-            jump_url = opus["jump_url"]
-            topic = item["modules"]["module_dynamic"]["topic"]
-
-            render_data["summary"] = summary["text"]
-            render_data["text"] = await parse_rich_text(summary, topic)
-            render_data["title"] = opus["title"]
-            render_data["image_urls"] = [pic["url"] for pic in opus["pics"][:9]]
+            render_data["summary"] = dyn.text
+            render_data["text"] = await parse_rich_text(dyn.rich_summary, dyn.topic)
+            render_data["title"] = dyn.title
+            render_data["image_urls"] = list(dyn.pics[:9])
             if not render_data["image_urls"] and self.rai:
-                render_data["image_urls"] = [await image_to_base64(LOGO_PATH)]
-            if not is_forward:
-                url = f"https:{jump_url}"
+                render_data["image_urls"] = [await self.asset_src(LOGO_PATH)]
+            if not is_forward and dyn.jump_url:
+                url = f"https:{dyn.jump_url}"
                 render_data["qrcode"] = await create_qrcode(url)
                 render_data["url"] = url
-            # logger.info(f"返回图文动态 {dyn_id}。")
             return render_data
-        elif item.get("type") == "DYNAMIC_TYPE_FORWARD":
+        elif dyn.type == DynamicType.FORWARD:
             # 转发动态
-            try:
-                content_text = item["modules"]["module_dynamic"]["desc"]["text"]
-            except (TypeError, KeyError):
-                content_text = None
-            if content_text:
-                rich_text = await parse_rich_text(
-                    item["modules"]["module_dynamic"]["desc"],
-                    item["modules"]["module_dynamic"]["topic"],
-                )
+            if dyn.text:
+                rich_text = await parse_rich_text(dyn.rich_summary, dyn.topic)
                 render_data["text"] = f"{rich_text}"
             return render_data
 
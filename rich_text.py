@@ -0,0 +1,115 @@
+"""
+B 站富文本节点渲染。
+按顺序遍历 rich_text_nodes 一次，将每个节点转义后写入列表缓冲区，最后拼接为 HTML。
+"""
+
+from html import escape
+from typing import Any, Callable, Dict, List, Optional
+
+Node = Dict[str, Any]
+
+
+def _escape_text(text: str) -> str:
+    # 绝大多数正文不含需转义字符，跳过 escape 的多次替换
+    if "&" in text or "<" in text or ">" in text:
+        return escape(text, quote=False)
+    return text
+
+
+def _escape_attr(value: str) -> str:
+    if "&" in value or "<" in value or ">" in value or "'" in value or '"' in value:
+        return escape(value)
+    return value
+
+
+def _full_url(url: str) -> str:
+    if url.startswith("//"):
+        return f"https:{url}"
+    return url
+
+
+def _link(href: str, text: str) -> str:
+    if not href:
+        return f"<a>{_escape_text(text)}</a>"
+    return f"<a href='{_escape_attr(_full_url(href))}'>{_escape_text(text)}</a>"
+
+
+def _node_text(node: Node) -> str:
+    return node.get("text") or node.get("orig_text") or ""
+
+
+def _emit_text(node: Node) -> str:
+    return _escape_text(_node_text(node))
+
+
+def _emit_emoji(node: Node) -> str:
+    emoji = node.get("emoji") or {}
+    icon_url = emoji.get("icon_url") or emoji.get("gif_url")
+    if not icon_url:
+        return _emit_text(node)
+    return f"<img src='{_escape_attr(icon_url)}'>"
+
+
+def _emit_topic(node: Node) -> str:
+    return _link(node.get("jump_url", ""), _node_text(node))
+
+
+def _emit_at(node: Node) -> str:
+    rid = node.get("rid")
+    href = f"https://space.bilibili.com/{rid}" if rid else ""
+    return _link(href, _node_text(node))
+
+
+def _emit_jump(node: Node) -> str:
+    return _link(node.get("jump_url", ""), _node_text(node))
+
+
+def _emit_vote(node: Node) -> str:
+    rid = node.get("rid")
+    href = (
+        f"https://t.bilibili.com/vote/h5/index/#/result?vote_id={rid}" if rid else ""
+    )
+    return _link(href, f"📊 {_node_text(node)}")
+
+
+def _emit_lottery(node: Node) -> str:
+    return _link(node.get("jump_url", ""), f"🎁 {_node_text(node)}")
+
+
+_EMITTERS: Dict[str, Callable[[Node], str]] = {
+    "RICH_TEXT_NODE_TYPE_TEXT": _emit_text,
+    "RICH_TEXT_NODE_TYPE_EMOJI": _emit_emoji,
+    "RICH_TEXT_NODE_TYPE_TOPIC": _emit_topic,
+    "RICH_TEXT_NODE_TYPE_AT": _emit_at,
+    "RICH_TEXT_NODE_TYPE_WEB": _emit_jump,
+    "RICH_TEXT_NODE_TYPE_BV": _emit_jump,
+    "RICH_TEXT_NODE_TYPE_CV": _emit_jump,
+    "RICH_TEXT_NODE_TYPE_OGV_SEASON": _emit_jump,
+    "RICH_TEXT_NODE_TYPE_OGV_EP": _emit_jump,
+    "RICH_TEXT_NODE_TYPE_GOODS": _emit_jump,
+    "RICH_TEXT_NODE_TYPE_VOTE": _emit_vote,
+    "RICH_TEXT_NODE_TYPE_LOTTERY": _emit_lottery,
+}
+
+
+def render_rich_text(summary: Dict[str, Any], topic: Optional[Dict[str, Any]] = None) -> str:
+    """
+    将动态正文（含 text 与 rich_text_nodes）渲染为 HTML。
+    换行转换为 <br> 并去除空行；存在真正的话题时在开头加上话题链接。
+    """
+    nodes: List[Node] = summary.get("rich_text_nodes") or []
+    buf: List[str] = []
+    if nodes:
+        emitters = _EMITTERS
+        for node in nodes:
+            buf.append(emitters.get(node.get("type"), _emit_text)(node))
+    else:
+        buf.append(_escape_text(summary.get("text") or ""))
+
+    text = "<br>".join(filter(None, "".join(buf).split("\n")))
+    if topic:
+        topic_link = (
+            f"<a href='{_escape_attr(topic['jump_url'])}'># {_escape_text(topic['name'])}</a>"
+        )
+        text = f"# {topic_link}<br>" + text
+    return text
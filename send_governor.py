@@ -0,0 +1,117 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict
+from astrbot.api import logger
+from astrbot.api.event import MessageEventResult
+from astrbot.api.message_components import Node, Plain
+from .proxy_pool import TokenBucket
+from .constant import SEND_SESSION_BURST, SEND_PLATFORM_BURST, SEND_COLLAPSE_THRESHOLD
+
+
+def collapse_messages(messages: list) -> MessageEventResult:
+    """将多条消息合并为一条转发消息，原有的转发节点会被展开。"""
+    parts = []
+    for message in messages:
+        for comp in message.chain:
+            if isinstance(comp, Node):
+                parts.extend(comp.content)
+            else:
+                parts.append(comp)
+        parts.append(Plain("\n"))
+    return MessageEventResult(chain=[Node(uin=0, name="AstrBot", content=parts)])
+
+
+class SendGovernor:
+    """
+    推送限速。每个会话（unified_msg_origin）与每个平台各有一个令牌桶，
+    消息按会话排队、依次等待两级令牌后发出，同一会话内保持顺序。
+    某个会话积压超过阈值时，排队中的消息合并为一条转发消息，避免长时间刷屏。
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, Any], Awaitable[Any]],
+        session_per_min: float,
+        platform_per_min: float,
+    ):
+        self.send = send
+        self.session_rate = session_per_min / 60
+        self.platform_rate = platform_per_min / 60
+        self._queues: Dict[str, Deque[Any]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._session_buckets: Dict[str, TokenBucket] = {}
+        self._platform_buckets: Dict[str, TokenBucket] = {}
+        self.collapsed = 0
+
+    @staticmethod
+    def platform_of(umo: str) -> str:
+        return umo.split(":", 1)[0]
+
+    def submit(self, umo: str, message: Any, urgent: bool = False):
+        """
+        将消息加入会话队列，立即返回。urgent 的消息（如开播通知）排到队首。
+        """
+        queue = self._queues.setdefault(umo, deque())
+        if urgent:
+            queue.appendleft(message)
+        else:
+            queue.append(message)
+            if len(queue) > SEND_COLLAPSE_THRESHOLD:
+                self._collapse(umo, queue)
+        worker = self._workers.get(umo)
+        if worker is None or worker.done():
+            self._workers[umo] = asyncio.create_task(self._run(umo))
+
+    def _collapse(self, umo: str, queue: Deque[Any]):
+        # 队首的消息可能已是合并结果，一并展开重新合并
+        self.collapsed += len(queue) - 1
+        merged = collapse_messages(list(queue))
+        queue.clear()
+        queue.append(merged)
+        logger.info(f"会话 {umo} 待推送消息积压，已合并为一条转发消息")
+
+    def _bucket(self, buckets: Dict[str, TokenBucket], key: str, rate: float, burst: int):
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(rate, burst)
+        return bucket
+
+    async def _run(self, umo: str):
+        queue = self._queues[umo]
+        session_bucket = self._bucket(
+            self._session_buckets, umo, self.session_rate, SEND_SESSION_BURST
+        )
+        platform_bucket = self._bucket(
+            self._platform_buckets,
+            self.platform_of(umo),
+            self.platform_rate,
+            SEND_PLATFORM_BURST,
+        )
+        while queue:
+            # 先取会话令牌，避免单个会话等待时占用平台令牌
+            await session_bucket.acquire()
+            await platform_bucket.acquire()
+            if not queue:
+                break
+            message = queue.popleft()
+            try:
+                await self.send(umo, message)
+            except Exception as e:
+                logger.error(f"向 {umo} 推送消息时发生错误: {e}")
+        self._queues.pop(umo, None)
+        self._workers.pop(umo, None)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "queued": sum(len(q) for q in self._queues.values()),
+            "sessions": len(self._queues),
+            "collapsed": self.collapsed,
+        }
+
+    async def close(self):
+        workers = list(self._workers.values())
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._workers.clear()
+        self._queues.clear()
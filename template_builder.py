@@ -0,0 +1,210 @@
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from jinja2 import Environment, Template
+
+_STYLE_RE = re.compile(r"(<style[^>]*>)(.*?)(</style>)", re.S | re.I)
+_HTML_COMMENT_RE = re.compile(r"<!--(?!\[if).*?-->", re.S)
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_CLASS_ATTR_RE = re.compile(r"""class\s*=\s*(["'])(.*?)\1""", re.S | re.I)
+_JINJA_RE = re.compile(r"\{\{.*?\}\}|\{%.*?%\}", re.S)
+_SELECTOR_CLASS_RE = re.compile(r"\.(-?[_a-zA-Z][\w-]*)")
+_FONT_LINK_RE = re.compile(
+    r"""<link[^>]*href\s*=\s*(["'])(https://fonts\.googleapis\.com/[^"']+)\1[^>]*>""",
+    re.S | re.I,
+)
+_FONT_FAMILY_RE = re.compile(r"font-family\s*:([^;}]+)", re.I)
+_RAW_END_RE = re.compile(r"\{%-?\s*endraw\s*-?%\}")
+_HEAD_RE = re.compile(r"<head[^>]*>(.*?)</head>", re.S | re.I)
+_BODY_RE = re.compile(r"<body[^>]*>(.*)</body>", re.S | re.I)
+# 批量页面中 body 改为纵向排列；分隔条为绿-品红-绿三段色带，颜色与 BATCH_SEP_COLORS 一致
+_BATCH_CSS = (
+    "body{display:block!important;min-height:0!important}"
+    ".bili-batch-item{display:flex;justify-content:flex-start;align-items:flex-start}"
+    ".bili-batch-sep{display:block;width:100%;height:18px;margin:0;"
+    "background:linear-gradient(#00ff00 0 6px,#ff00ff 6px 12px,#00ff00 12px 18px)}"
+)
+
+_env = Environment()
+
+
+@dataclass
+class BuiltTemplate:
+    """构建完成的模板：压缩后的源码与本地编译结果。"""
+
+    style: str
+    source: str
+    compiled: Optional[Template]
+
+    def render(self, render_data: Dict[str, Any]) -> str:
+        return self.compiled.render(**render_data)
+
+
+def build_template(style: str, raw: str) -> BuiltTemplate:
+    """
+    模板构建：剔除未使用的样式与字体、压缩 HTML/CSS 并在本地编译。
+    """
+    used_classes, used_prefixes = _collect_classes(raw)
+
+    def _rewrite_style(match: re.Match) -> str:
+        css = prune_css(match.group(2), used_classes, used_prefixes)
+        return f"{match.group(1)}{minify_css(css)}{match.group(3)}"
+
+    html = _STYLE_RE.sub(_rewrite_style, raw)
+    html = _prune_font_links(html)
+    source = minify_html(html)
+    return BuiltTemplate(
+        style=style,
+        source=source,
+        compiled=_env.from_string(source),
+    )
+
+
+def as_static_template(html: str) -> str:
+    """
+    将本地预渲染的 HTML 包装为不含模板语法的静态模板，
+    避免渲染端再次以 Jinja 解析时误处理正文中的 {{ }} 等字符。
+    """
+    html = _RAW_END_RE.sub(lambda m: m.group(0).replace("%", "&#37;"), html)
+    return "{% raw %}" + html + "{% endraw %}"
+
+
+def compose_batch_document(htmls: List[str]) -> str:
+    """
+    将多份本地预渲染的卡片 HTML 合并为一个页面：沿用第一份的 head，
+    各卡片 body 依次排列，中间插入供切分识别的色带分隔条。
+    """
+    head_match = _HEAD_RE.search(htmls[0])
+    head = head_match.group(1) if head_match else ""
+    blocks = []
+    for html in htmls:
+        body_match = _BODY_RE.search(html)
+        blocks.append(
+            f'<div class="bili-batch-item">{body_match.group(1) if body_match else html}</div>'
+        )
+    sep = '<div class="bili-batch-sep"></div>'
+    return (
+        f"<!DOCTYPE html><html><head>{head}<style>{_BATCH_CSS}</style></head>"
+        f"<body>{sep.join(blocks)}</body></html>"
+    )
+
+
+def minify_html(html: str) -> str:
+    """
+    移除 HTML 注释并折叠空白。
+    连续空白保留为一个空格，不改变行内元素间距；模板中没有 pre 等需保留空白的元素。
+    """
+    html = _HTML_COMMENT_RE.sub("", html)
+    html = re.sub(r"\s+", " ", html)
+    return html.strip()
+
+
+def minify_css(css: str) -> str:
+    """移除 CSS 注释并折叠空白。"""
+    css = _CSS_COMMENT_RE.sub("", css)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    # 仅去掉冒号后的空白，冒号前的空白在选择器中有语义（如 "a :hover"）
+    css = re.sub(r":\s+", ":", css)
+    css = css.replace(";}", "}")
+    return css.strip()
+
+
+def prune_css(css: str, used_classes: Set[str], used_prefixes: Set[str]) -> str:
+    """
+    删除选择器中引用了模板未使用的 class 的规则。
+    @ 规则（@media、@font-face 等）原样保留。
+    """
+    css = _CSS_COMMENT_RE.sub("", css)
+    out: List[str] = []
+    for prelude, body in _split_rules(css):
+        if prelude.lstrip().startswith("@"):
+            out.append(f"{prelude}{{{body}}}")
+            continue
+        selectors = [
+            s
+            for s in prelude.split(",")
+            if _selector_used(s, used_classes, used_prefixes)
+        ]
+        if selectors:
+            out.append(f"{','.join(selectors)}{{{body}}}")
+    return "\n".join(out)
+
+
+def _split_rules(css: str) -> List[Tuple[str, str]]:
+    """按顶层花括号拆分 CSS 规则，返回 (选择器/at 规则头, 规则体) 列表。"""
+    rules: List[Tuple[str, str]] = []
+    depth = 0
+    start = 0
+    prelude = ""
+    for i, ch in enumerate(css):
+        if ch == "{":
+            if depth == 0:
+                prelude = css[start:i]
+                start = i + 1
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                rules.append((prelude.strip(), css[start:i]))
+                start = i + 1
+    return rules
+
+
+def _selector_used(selector: str, used_classes: Set[str], used_prefixes: Set[str]) -> bool:
+    for cls in _SELECTOR_CLASS_RE.findall(selector):
+        if cls in used_classes:
+            continue
+        if any(cls.startswith(p) for p in used_prefixes):
+            continue
+        return False
+    return True
+
+
+def _collect_classes(html: str) -> Tuple[Set[str], Set[str]]:
+    """
+    收集模板中出现的 class。
+    形如 "grid-{{ n }}" 的动态 class 记为前缀 "grid-"，匹配所有以其开头的选择器。
+    """
+    classes: Set[str] = set()
+    prefixes: Set[str] = set()
+    for _, value in _CLASS_ATTR_RE.findall(html):
+        for token in _JINJA_RE.sub("\0", value).split():
+            if "\0" in token:
+                prefix = token.split("\0", 1)[0]
+                if prefix:
+                    prefixes.add(prefix)
+                else:
+                    # 整个 class 均为动态表达式，无法判断，保留全部规则
+                    prefixes.add("")
+            else:
+                classes.add(token)
+    return classes, prefixes
+
+
+def _prune_font_links(html: str) -> str:
+    """Google Fonts 链接仅保留样式中实际引用的字体族，一个都未引用时移除整个链接。"""
+    used_families = set()
+    for _, css, _ in _STYLE_RE.findall(html):
+        for decl in _FONT_FAMILY_RE.findall(css):
+            for family in decl.split(","):
+                used_families.add(family.strip().strip("\"'").lower())
+
+    def _rewrite(match: re.Match) -> str:
+        href = match.group(2).replace("&amp;", "&")
+        parts = urlsplit(href)
+        query = parse_qsl(parts.query, keep_blank_values=True)
+        kept = [
+            (k, v)
+            for k, v in query
+            if k != "family"
+            or v.split(":", 1)[0].replace("+", " ").lower() in used_families
+        ]
+        if not any(k == "family" for k, _ in kept):
+            return ""
+        new_href = urlunsplit(parts._replace(query=urlencode(kept, safe=":;@,+")))
+        return match.group(0).replace(match.group(2), new_href)
+
+    return _FONT_LINK_RE.sub(_rewrite, html)
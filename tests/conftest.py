@@ -0,0 +1,14 @@
+import sys
+import importlib.util
+from importlib.machinery import ModuleSpec
+from pathlib import Path
+
+# 插件目录本身没有 __init__.py，由 AstrBot 按目录加载；测试中将其注册为同名包，
+# 以便模块间的相对导入正常工作
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = "astrbot_plugin_bilibili"
+
+if PACKAGE not in sys.modules:
+    package = importlib.util.module_from_spec(ModuleSpec(PACKAGE, None, is_package=True))
+    package.__path__ = [str(ROOT)]
+    sys.modules[PACKAGE] = package
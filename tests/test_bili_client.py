@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("astrbot")
+pytest.importorskip("bilibili_api")
+
+from bilibili_api import user, video
+from bilibili_api.exceptions import NetworkException, ResponseCodeException
+from bilibili_api.utils import network as bili_network
+
+from astrbot_plugin_bilibili.bili_client import BiliClient, LIVE_STATUS_API
+from astrbot_plugin_bilibili.metrics import metrics
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # 不访问网络：跳过自动获取 buvid / bili_ticket，由测试替换实际发送
+    monkeypatch.setattr(
+        bili_network.request_settings, "get_enable_auto_buvid", lambda: False
+    )
+    monkeypatch.setattr(
+        bili_network.request_settings, "get_enable_bili_ticket", lambda: False
+    )
+    metrics.reset()
+    return BiliClient("A", extra_credentials=["SESSDATA=B||UA-B"])
+
+
+def fake_send(monkeypatch, *responses):
+    sent = []
+    queue = list(responses)
+
+    async def send(config):
+        sent.append(config)
+        return queue.pop(0)
+
+    monkeypatch.setattr(BiliClient, "_send_direct", staticmethod(send))
+    return sent
+
+
+def request(client: BiliClient):
+    return asyncio.run(
+        client._pooled_request(LIVE_STATUS_API, {"uids[]": [1]}, no_csrf=True)
+    )
+
+
+def test_http_412_quarantines_slot(client, monkeypatch):
+    fake_send(monkeypatch, (412, b"<html>412</html>"))
+    with pytest.raises(NetworkException) as exc:
+        request(client)
+    assert exc.value.status == 412
+    risky = client.credentials.snapshot()[0]
+    assert not risky["available"] and risky["risk"] == 1
+    assert metrics.counters["api.error.412"] == 1
+    # 下一次请求改用未被隔离的账号
+    assert client.credentials.acquire().label != risky["label"]
+
+
+def test_code_352_quarantines_slot(client, monkeypatch):
+    fake_send(monkeypatch, (200, b'{"code": -352, "message": "risk"}'))
+    with pytest.raises(ResponseCodeException) as exc:
+        request(client)
+    assert exc.value.code == -352
+    risky = client.credentials.snapshot()[0]
+    assert not risky["available"] and risky["risk"] == 1
+    assert metrics.counters["api.error.-352"] == 1
+
+
+def test_success_returns_data(client, monkeypatch):
+    fake_send(monkeypatch, (200, b'{"code": 0, "data": {"1": {"live_status": 1}}}'))
+    assert request(client) == {"1": {"live_status": 1}}
+    assert all(slot["available"] for slot in client.credentials.snapshot())
+
+
+def test_wbi_403_refreshes_mixin_key(client, monkeypatch):
+    refreshed = []
+    monkeypatch.setattr(bili_network, "recalculate_wbi", lambda: refreshed.append(1))
+
+    async def mixin_key(credential=None):
+        return "0" * 32
+
+    monkeypatch.setattr(bili_network, "get_wbi_mixin_key", mixin_key)
+    sent = fake_send(
+        monkeypatch,
+        (200, b'{"code": -403, "message": "forbidden"}'),
+        (200, b'{"code": 0, "data": {"items": [], "has_more": false}}'),
+    )
+    page = asyncio.run(client._fetch_dynamics_page(1))
+    assert page["items"] == []
+    assert len(sent) == 2 and refreshed == [1]
+    assert "w_rid" in sent[-1]["params"]
+
+
+def test_video_list_uses_credential_pool(client, monkeypatch):
+    async def access_id(self):
+        return "webid"
+
+    async def mixin_key(credential=None):
+        return "0" * 32
+
+    monkeypatch.setattr(bili_network, "get_wbi_mixin_key", mixin_key)
+    monkeypatch.setattr(user.User, "get_access_id", access_id)
+    sent = fake_send(
+        monkeypatch,
+        (200, b'{"code": 0, "data": {"list": {"vlist": [{"bvid": "BV1", "created": 1}]}}}'),
+    )
+    videos = asyncio.run(client.get_latest_videos(1, raise_errors=True))
+    assert [v["bvid"] for v in videos] == ["BV1"]
+    assert sent[0]["url"].endswith("/x/space/wbi/arc/search")
+    assert sent[0]["params"]["w_webid"] == "webid"
+    assert sum(slot["requests"] for slot in client.credentials.snapshot()) == 1
+
+
+def patch_video(monkeypatch):
+    calls = []
+
+    async def get_info(self):
+        calls.append(("info", self.get_bvid()))
+        return {"bvid": self.get_bvid()}
+
+    async def get_online(self):
+        calls.append(("online", self.get_bvid()))
+        return {"total": "1"}
+
+    monkeypatch.setattr(video.Video, "get_info", get_info)
+    monkeypatch.setattr(video.Video, "get_online", get_online)
+    return calls
+
+
+def test_video_info_without_online(client, monkeypatch):
+    calls = patch_video(monkeypatch)
+    result = asyncio.run(client.get_video_info("BV1xx411c7mD", with_online=False))
+    assert result["online"] is None
+    assert calls == [("info", "BV1xx411c7mD")]
+    # 完整结果也可满足不需要在线人数的查询
+    asyncio.run(client.get_video_info("BV1xx411c7mE"))
+    calls.clear()
+    asyncio.run(client.get_video_info("BV1xx411c7mE", with_online=False))
+    assert calls == []
+
+
+def test_videos_info_batches_and_dedupes(client, monkeypatch):
+    calls = patch_video(monkeypatch)
+    bvids = ["BV1xx411c7mA", "BV1xx411c7mB", "BV1xx411c7mA"]
+    results = asyncio.run(client.get_videos_info(bvids))
+    assert list(results) == ["BV1xx411c7mA", "BV1xx411c7mB"]
+    assert sorted(calls) == [("info", "BV1xx411c7mA"), ("info", "BV1xx411c7mB")]
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("astrbot")
+
+from astrbot_plugin_bilibili.constant import BANNER_PATH, LOGO_PATH
+from astrbot_plugin_bilibili.data_manager import DataManager
+from astrbot_plugin_bilibili.renderer import Renderer
+
+
+@pytest.fixture
+def data_manager(tmp_path):
+    manager = DataManager.__new__(DataManager)
+    manager.path = str(tmp_path / "data.json")
+    manager.data = {"bili_sub_list": {}}
+    return manager
+
+
+def test_suspend_and_restore_merges_by_uid(data_manager):
+    sub_user = "aiocqhttp:GroupMessage:1"
+    data_manager.data["bili_sub_list"][sub_user] = [{"uid": 1}, {"uid": 2}]
+    assert asyncio.run(data_manager.suspend_session(sub_user, "退群")) == 2
+    assert data_manager.is_suspended(sub_user)
+
+    # 暂停期间出现的同一 UP 主订阅保留现有的一条
+    data_manager.data["bili_sub_list"][sub_user] = [{"uid": "2", "filter_types": ["draw"]}]
+    assert asyncio.run(data_manager.restore_session("1")) == f"已恢复 {sub_user} 的 1 条订阅"
+    subs = data_manager.get_all_subscriptions()[sub_user]
+    assert [str(s["uid"]) for s in subs] == ["2", "1"]
+    assert subs[0]["filter_types"] == ["draw"]
+    assert not data_manager.is_suspended(sub_user)
+
+
+def test_resume_session_not_suspended(data_manager):
+    assert asyncio.run(data_manager.resume_session("aiocqhttp:GroupMessage:1")) == 0
+    assert asyncio.run(data_manager.restore_session("1")) == "未找到被暂停的会话"
+
+
+def test_digest_buffer_survives_reload(data_manager):
+    # 未启用资源服务器时 banner / logo 为 base64，写盘前应替换为占位符（含转发的原动态）
+    renderer = Renderer.__new__(Renderer)
+    renderer.asset_server = None
+    banner = asyncio.run(renderer.asset_src(BANNER_PATH))
+    logo = asyncio.run(renderer.asset_src(LOGO_PATH))
+    forward = {
+        "url": "b",
+        "banner": banner,
+        "forward": {"banner": banner, "image_urls": [logo], "text": "原动态"},
+    }
+    sub_user = "aiocqhttp:GroupMessage:1"
+    asyncio.run(data_manager.buffer_digest(sub_user, [{"url": "a", "banner": banner}]))
+    asyncio.run(
+        data_manager.buffer_digest(sub_user, asyncio.run(renderer.detach_assets([forward])))
+    )
+    with open(data_manager.path, encoding="utf-8") as f:
+        saved = f.read()
+    assert saved.count("base64") == 1  # 仅未经 detach_assets 的第一条
+
+    reloaded = DataManager.__new__(DataManager)
+    reloaded.path = data_manager.path
+    reloaded.data = reloaded._load_data()
+    items = asyncio.run(reloaded.pop_digest(sub_user))
+    assert [d["url"] for d in items] == ["a", "b"]
+    assert asyncio.run(renderer.attach_assets(items[1:])) == [forward]
+    assert reloaded.get_digest_buffers() == {}
+    assert asyncio.run(reloaded.pop_digest(sub_user)) == []
@@ -0,0 +1,49 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("astrbot")
+
+from astrbot_plugin_bilibili import listener as listener_module
+from astrbot_plugin_bilibili.data_manager import DataManager
+from astrbot_plugin_bilibili.listener import DynamicListener
+
+SUB_USER = "aiocqhttp:GroupMessage:1"
+
+
+@pytest.fixture
+def listener(tmp_path, monkeypatch):
+    # 取消暂停前的最短持续时间，只看失败次数
+    monkeypatch.setattr(listener_module, "DELIVERY_SUSPEND_MIN_SPAN", 0)
+    data_manager = DataManager.__new__(DataManager)
+    data_manager.path = str(tmp_path / "data.json")
+    data_manager.data = {"bili_sub_list": {SUB_USER: [{"uid": 1}]}}
+    instance = DynamicListener.__new__(DynamicListener)
+    instance.data_manager = data_manager
+    instance.delivery_failure_limit = 3
+    instance.admin_sid = ""
+    instance._delivery_failures = {}
+    return instance
+
+
+def send_failing(listener, error):
+    async def send_message(umo, message):
+        raise error
+
+    listener.context = SimpleNamespace(send_message=send_message)
+    for _ in range(5):
+        asyncio.run(listener._send_now(SUB_USER, object()))
+
+
+def test_generic_403_does_not_suspend(listener):
+    send_failing(
+        listener,
+        RuntimeError("403, message='Forbidden', url='https://i0.hdslb.com/bfs/a.jpg'"),
+    )
+    assert not listener.data_manager.is_suspended(SUB_USER)
+
+
+def test_bot_removed_suspends(listener):
+    send_failing(listener, RuntimeError("Forbidden: bot was kicked from the group chat"))
+    assert listener.data_manager.is_suspended(SUB_USER)
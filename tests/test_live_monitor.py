@@ -0,0 +1,145 @@
+import json
+import zlib
+import asyncio
+
+import pytest
+
+pytest.importorskip("astrbot")
+aiohttp = pytest.importorskip("aiohttp")
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from astrbot_plugin_bilibili import live_monitor
+from astrbot_plugin_bilibili.live_monitor import (
+    HEADER,
+    LiveRoomMonitor,
+    OP_AUTH,
+    OP_AUTH_REPLY,
+    OP_HEARTBEAT,
+    OP_HEARTBEAT_REPLY,
+    OP_MESSAGE,
+    PROTO_JSON,
+    PROTO_ZLIB,
+    pack,
+    unpack,
+)
+
+
+def broadcast(cmd: str) -> bytes:
+    """zlib 压缩包，内含一条目标命令和一条无关的弹幕消息。"""
+    inner = pack(OP_MESSAGE, json.dumps({"cmd": cmd}).encode(), PROTO_JSON) + pack(
+        OP_MESSAGE, b'{"cmd":"DANMU_MSG:4:0"}', PROTO_JSON
+    )
+    return pack(OP_MESSAGE, zlib.compress(inner), PROTO_ZLIB)
+
+
+def test_unpack_zlib_packet():
+    packets = unpack(broadcast("LIVE"))
+    assert packets == [
+        (OP_MESSAGE, {"cmd": "LIVE"}),
+        (OP_MESSAGE, {"cmd": "DANMU_MSG:4:0"}),
+    ]
+    assert unpack(pack(OP_HEARTBEAT_REPLY, (7).to_bytes(4, "big"))) == [
+        (OP_HEARTBEAT_REPLY, 7)
+    ]
+
+
+class StandInServer:
+    """本地弹幕服务器：回复鉴权与心跳，并可向指定直播间下发数据。"""
+
+    def __init__(self):
+        self.auths = []
+        self.heartbeats = 0
+        self.rooms = {}
+        app = web.Application()
+        app.router.add_get("/sub", self.handle)
+        self.server = TestServer(app)
+
+    async def handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for msg in ws:
+            op = HEADER.unpack_from(msg.data)[3]
+            body = msg.data[HEADER.size :]
+            if op == OP_AUTH:
+                auth = json.loads(body)
+                self.auths.append(auth)
+                self.rooms[auth["roomid"]] = ws
+                await ws.send_bytes(pack(OP_AUTH_REPLY, b'{"code":0}', PROTO_JSON))
+            elif op == OP_HEARTBEAT:
+                self.heartbeats += 1
+                await ws.send_bytes(pack(OP_HEARTBEAT_REPLY, (1).to_bytes(4, "big")))
+        return ws
+
+
+class StandInClient:
+    credential = None
+
+    def __init__(self):
+        self.session = None
+
+    async def ws_connect(self, url):
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+        return await self.session.ws_connect(url)
+
+
+async def wait_for(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("等待超时")
+        await asyncio.sleep(0.01)
+
+
+def test_monitor_against_stand_in_server(monkeypatch):
+    monkeypatch.setattr(live_monitor, "LIVE_WS_RECONNECT_BASE", 0.05)
+
+    async def scenario():
+        stand_in = StandInServer()
+        await stand_in.server.start_server()
+        client = StandInClient()
+        events = []
+
+        async def on_event(uid, live):
+            events.append((uid, live))
+
+        monitor = LiveRoomMonitor(
+            client, on_event, max_rooms=20, server_url=str(stand_in.server.make_url("/sub"))
+        )
+        try:
+            for i in range(20):
+                assert monitor.watch(str(i), 100 + i)
+            # 超出连接上限的直播间交由轮询处理
+            assert not monitor.watch("extra", 999)
+
+            await wait_for(lambda: all(monitor.is_connected(str(i)) for i in range(20)))
+            assert {a["roomid"] for a in stand_in.auths} == set(range(100, 120))
+            assert all(a["protover"] == PROTO_ZLIB for a in stand_in.auths)
+            # 鉴权成功后立即发送心跳
+            await wait_for(lambda: stand_in.heartbeats >= 20)
+
+            # 重复的开播广播只通知一次
+            await stand_in.rooms[105].send_bytes(broadcast("LIVE"))
+            await stand_in.rooms[105].send_bytes(broadcast("LIVE"))
+            await wait_for(lambda: events)
+            await stand_in.rooms[105].send_bytes(broadcast("PREPARING"))
+            await wait_for(lambda: len(events) == 2)
+            assert events == [("5", True), ("5", False)]
+
+            # 服务端断开后自动重连并重新鉴权
+            auths = len(stand_in.auths)
+            await stand_in.rooms[103].close()
+            await wait_for(lambda: len(stand_in.auths) > auths)
+            await wait_for(lambda: monitor.is_connected("3"))
+
+            monitor.retain([str(i) for i in range(10)])
+            assert len(monitor) == 10 and not monitor.is_connected("15")
+        finally:
+            await monitor.close()
+            await client.session.close()
+            await stand_in.server.close()
+        assert monitor.snapshot() == {"rooms": 0, "connected": 0, "workers": 0}
+
+    asyncio.run(scenario())
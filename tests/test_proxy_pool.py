@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("astrbot")
+pytest.importorskip("bilibili_api")
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from bilibili_api.exceptions import NetworkException
+from bilibili_api.utils import network as bili_network
+
+from astrbot_plugin_bilibili import proxy_pool
+from astrbot_plugin_bilibili.bili_client import BiliClient
+
+# 使用 http 目标地址，代理收到绝对形式的请求后直接应答，无需建立 CONNECT 隧道
+TARGET_API = {"url": "http://api.bilibili.test/x/stand-in", "method": "GET", "verify": False}
+
+
+class StandInProxy:
+    """本地代理替身：记录经过的请求，按 failing 决定返回正常数据或 502。"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.failing = False
+        self.requests = []
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self.handle)
+        self.server = TestServer(app)
+
+    async def handle(self, request):
+        self.requests.append((request.host, request.query.get("mid")))
+        if self.failing:
+            return web.Response(status=502)
+        return web.json_response({"code": 0, "data": {"proxy": self.name}})
+
+    @property
+    def url(self) -> str:
+        return str(self.server.make_url("")).rstrip("/")
+
+
+async def request(client: BiliClient, uid: int) -> str:
+    data = await client._pooled_request(TARGET_API, {"mid": uid}, route_key=uid)
+    return data["proxy"]
+
+
+def test_sticky_routing_and_failover(monkeypatch):
+    monkeypatch.setattr(
+        bili_network.request_settings, "get_enable_auto_buvid", lambda: False
+    )
+    monkeypatch.setattr(
+        bili_network.request_settings, "get_enable_bili_ticket", lambda: False
+    )
+    monkeypatch.setattr(proxy_pool, "PROXY_EJECT_TIME", 0.2)
+
+    async def scenario():
+        proxies = [StandInProxy("a"), StandInProxy("b")]
+        for p in proxies:
+            await p.server.start_server()
+        client = BiliClient("A", proxies=[p.url for p in proxies], proxy_rate=1000)
+        try:
+            uids = list(range(1, 21))
+            # 同一 UID 始终走同一出口，且请求确实经由该代理发出
+            first = {uid: await request(client, uid) for uid in uids}
+            assert {uid: await request(client, uid) for uid in uids} == first
+            assert set(first.values()) == {"a", "b"}
+            a, b = proxies
+            assert ("api.bilibili.test", "1") in a.requests + b.requests
+
+            # 出口 a 持续返回 502，达到样本数后被剔除，原本落在 a 上的 UID 改走 b
+            a.failing = True
+            on_a = [uid for uid in uids if first[uid] == "a"]
+            for _ in range(proxy_pool.PROXY_MIN_SAMPLES * 2):
+                if not client.proxies.snapshot()[0]["available"]:
+                    break
+                with pytest.raises(NetworkException):
+                    await request(client, on_a[0])
+            assert not client.proxies.snapshot()[0]["available"]
+            assert all([await request(client, uid) == "b" for uid in on_a])
+
+            # 冷却结束后重新加入，UID 回到原来的出口
+            a.failing = False
+            await asyncio.sleep(0.25)
+            assert {uid: await request(client, uid) for uid in uids} == first
+        finally:
+            await client.close()
+            for p in proxies:
+                await p.server.close()
+
+    asyncio.run(scenario())
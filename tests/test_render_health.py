@@ -0,0 +1,50 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("astrbot")
+
+from astrbot_plugin_bilibili.render_health import RenderHealth
+from astrbot_plugin_bilibili.renderer import Renderer
+
+
+def half_open_renderer(html_render):
+    renderer = Renderer.__new__(Renderer)
+    renderer.health = RenderHealth(failure_threshold=1, cooldown=0)
+    renderer.health.record_failure("初始失败")
+    renderer.star = SimpleNamespace(html_render=html_render)
+    return renderer
+
+
+def test_cancelled_probe_reopens_breaker():
+    started = asyncio.Event()
+
+    async def hang(**kwargs):
+        started.set()
+        await asyncio.sleep(3600)
+
+    async def scenario():
+        renderer = half_open_renderer(hang)
+        task = asyncio.create_task(renderer._html_render("<p></p>"))
+        await started.wait()
+        assert renderer.health.state == RenderHealth.HALF_OPEN
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return renderer.health
+
+    health = asyncio.run(scenario())
+    # 被取消的探测计为失败，熔断器重新打开，冷却结束后可以再次探测
+    assert health.state == RenderHealth.OPEN
+    assert health.allow_request()
+
+
+def test_failed_probe_is_recorded_once():
+    async def fail(**kwargs):
+        raise RuntimeError("boom")
+
+    renderer = half_open_renderer(fail)
+    assert asyncio.run(renderer._html_render("<p></p>")) is None
+    assert renderer.health.state == RenderHealth.OPEN
+    assert renderer.health.total_failure == 2
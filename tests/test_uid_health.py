@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("astrbot")
+pytest.importorskip("bilibili_api")
+
+from bilibili_api.exceptions import NetworkException, ResponseCodeException
+
+from astrbot_plugin_bilibili.uid_health import (
+    PollBackoff,
+    UidFailureTracker,
+    is_request_error,
+)
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        NetworkException(412, ""),
+        NetworkException(502, ""),
+        asyncio.TimeoutError(),
+        ResponseCodeException(-352, "risk", {}),
+        ResponseCodeException(-403, "forbidden", {}),
+        ResponseCodeException(-400, "bad request", {}),
+    ],
+)
+def test_request_errors_are_not_uid_faults(error):
+    assert is_request_error(error)
+
+
+def test_uid_errors():
+    assert not is_request_error(ResponseCodeException(-404, "not found", {}))
+    assert not is_request_error(KeyError("modules"))
+
+
+def test_permanent_error_quarantines_and_release():
+    tracker = UidFailureTracker()
+    entry = tracker.record_failure("1", "gone", permanent=True)
+    assert entry.quarantined and tracker.should_skip("1")
+    assert tracker.release("1")
+    assert not tracker.should_skip("1") and not tracker.release("1")
+
+
+def test_poll_backoff_doubles_and_resets():
+    backoff = PollBackoff()
+    backoff.record_failure(NetworkException(502, ""))
+    first = backoff.retry_in
+    backoff.record_failure(NetworkException(502, ""))
+    assert backoff.active() and backoff.retry_in > first
+    backoff.record_success()
+    assert backoff.failures == 0
+
+
+def test_request_errors_do_not_starve_later_uids(monkeypatch):
+    from types import SimpleNamespace
+
+    from astrbot_plugin_bilibili import uid_health
+    from astrbot_plugin_bilibili.listener import DynamicListener
+
+    monkeypatch.setattr(uid_health, "POLL_BACKOFF_BASE", 0.01)
+    checked = []
+
+    async def check_uid(uid, subscribers):
+        checked.append(uid)
+        if uid == "2":
+            raise ResponseCodeException(-403, "forbidden", {})
+
+    listener = DynamicListener.__new__(DynamicListener)
+    listener.bili_client = SimpleNamespace(credential=object())
+    listener.renderer = SimpleNamespace(health=SimpleNamespace(available=True))
+    listener.data_manager = SimpleNamespace(
+        get_all_subscriptions=lambda: {"s": [{"uid": 1}, {"uid": 2}, {"uid": 3}]}
+    )
+    listener.interval_mins = 0.0005
+    listener.uid_health = UidFailureTracker()
+    listener.poll_backoff = PollBackoff()
+    listener._check_uid = check_uid
+
+    async def run():
+        task = asyncio.ensure_future(listener._poll_forever())
+        while checked.count("3") < 5:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(asyncio.wait_for(run(), 10))
+    # 排在出错 UP 主之后的 UP 主每轮都被检查
+    assert checked[:6] == ["1", "2", "3", "1", "2", "3"]
+    # 只有该 UP 主持续出错，达到次数后计入其失败并开始退避
+    assert listener.uid_health.should_skip("2")
+    assert checked.count("2") == 3
@@ -0,0 +1,144 @@
+import json
+import time
+import asyncio
+import aiohttp
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from astrbot.api import logger
+from bilibili_api.exceptions import ResponseCodeException, NetworkException
+from .constant import (
+    UID_BACKOFF_BASE,
+    UID_BACKOFF_MAX,
+    UID_QUARANTINE_THRESHOLD,
+    UID_QUARANTINE_TIME,
+    UID_QUARANTINE_MAX_TIME,
+    POLL_BACKOFF_BASE,
+    POLL_BACKOFF_MAX,
+    UID_REQUEST_ERROR_LIMIT,
+)
+
+# 账号已注销 / 不存在等，短期内重试也不会成功
+PERMANENT_ERROR_CODES = {-404, 53013, 4100001}
+
+# 请求参数错误、签名失效与风控，出错的是请求本身而不是 UP 主
+REQUEST_ERROR_CODES = {-400, -403, -352, -412}
+
+
+def is_request_error(error: Exception) -> bool:
+    """网络故障、HTTP 错误状态、响应无法解析、签名与风控错误，与具体 UP 主无关。"""
+    if isinstance(error, ResponseCodeException):
+        return error.code in REQUEST_ERROR_CODES
+    return isinstance(
+        error,
+        (NetworkException, aiohttp.ClientError, asyncio.TimeoutError, json.JSONDecodeError),
+    )
+
+
+@dataclass
+class UidFailure:
+    uid: str
+    failures: int = 0
+    skip_until: float = 0.0
+    quarantined: bool = False
+    quarantine_count: int = 0
+    request_errors: int = 0
+    last_error: str = ""
+
+
+class UidFailureTracker:
+    """
+    记录每个 UP 主的连续失败次数。失败后按指数退避跳过若干轮轮询；
+    连续失败达到阈值或遇到永久性错误（账号不存在、已注销）时进入隔离，
+    隔离期更长且每次加倍。任意一次成功即清除记录。
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, UidFailure] = {}
+
+    def should_skip(self, uid: str) -> bool:
+        entry = self._entries.get(str(uid))
+        return entry is not None and time.monotonic() < entry.skip_until
+
+    def record_success(self, uid: str):
+        entry = self._entries.pop(str(uid), None)
+        if entry and entry.quarantined:
+            logger.info(f"UP 主 {uid} 已恢复正常，解除隔离")
+
+    def record_failure(self, uid: str, error: str, permanent: bool = False) -> UidFailure:
+        """记录一次失败并返回更新后的状态，调用方据此决定日志详细程度。"""
+        uid = str(uid)
+        entry = self._entries.setdefault(uid, UidFailure(uid))
+        entry.failures += 1
+        entry.last_error = error
+        now = time.monotonic()
+        if permanent or entry.failures >= UID_QUARANTINE_THRESHOLD:
+            duration = min(
+                UID_QUARANTINE_MAX_TIME, UID_QUARANTINE_TIME * 2**entry.quarantine_count
+            )
+            entry.quarantine_count += 1
+            if not entry.quarantined:
+                logger.warning(
+                    f"UP 主 {uid} 连续失败 {entry.failures} 次，隔离 {duration:.0f} 秒: {error}"
+                )
+            entry.quarantined = True
+        else:
+            duration = min(UID_BACKOFF_MAX, UID_BACKOFF_BASE * 2 ** (entry.failures - 1))
+        entry.skip_until = now + duration
+        return entry
+
+    def record_request_error(self, uid: str) -> bool:
+        """
+        记录一次只出现在该 UP 主上的请求类错误（前一次检查正常），不影响轮询。
+        连续达到 UID_REQUEST_ERROR_LIMIT 次后返回 True，调用方应改为计入该 UP 主的失败。
+        """
+        entry = self._entries.setdefault(str(uid), UidFailure(str(uid)))
+        entry.request_errors += 1
+        return entry.request_errors >= UID_REQUEST_ERROR_LIMIT
+
+    def release(self, uid: str) -> bool:
+        return self._entries.pop(str(uid), None) is not None
+
+    def quarantined(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "uid": e.uid,
+                "failures": e.failures,
+                "retry_in": max(0.0, e.skip_until - now),
+                "last_error": e.last_error,
+            }
+            for e in self._entries.values()
+            if e.quarantined
+        ]
+
+    def get(self, uid: str) -> Optional[UidFailure]:
+        return self._entries.get(str(uid))
+
+
+class PollBackoff:
+    """
+    与具体 UP 主无关的错误出现时整体暂停轮询，避免在网络故障或风控期间继续逐个请求；
+    按连续出错次数指数退避，任意一次成功即恢复。
+    """
+
+    def __init__(self):
+        self.failures = 0
+        self.until = 0.0
+
+    def active(self) -> bool:
+        return time.monotonic() < self.until
+
+    @property
+    def retry_in(self) -> float:
+        return max(0.0, self.until - time.monotonic())
+
+    def record_failure(self, error: Exception):
+        self.failures += 1
+        duration = min(POLL_BACKOFF_MAX, POLL_BACKOFF_BASE * 2 ** (self.failures - 1))
+        self.until = time.monotonic() + duration
+        logger.warning(f"请求接口出错，暂停轮询 {duration:.0f} 秒: {error}")
+
+    def record_success(self):
+        if self.failures:
+            logger.info("接口请求已恢复正常，继续轮询")
+        self.failures = 0
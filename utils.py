@@ -5,6 +5,23 @@ import base64
 from urllib.parse import urlparse
 from PIL import Image as PILImage
 from astrbot.api import logger
+from .constant import MAX_IMAGE_HEIGHT
+from .image_pipeline import read_image_size
+from .rich_text import render_rich_text
+
+try:
+    import orjson
+
+    def json_loads(data):
+        """解析 JSON，已安装 orjson 时直接解析字节，避免先解码为 str。"""
+        return orjson.loads(data)
+
+except ImportError:
+    import json
+
+    def json_loads(data):
+        """解析 JSON，已安装 orjson 时直接解析字节，避免先解码为 str。"""
+        return json.loads(data)
 
 
 async def create_render_data() -> dict:
@@ -68,40 +85,19 @@ def is_valid_url(url: str) -> bool:
 
 
 async def parse_rich_text(summary, topic):
-    text = "<br>".join(filter(None, summary["text"].split("\n")))
-    # 真正的话题
-    if topic:
-        topic_link = f"<a href='{topic['jump_url']}'># {topic['name']}</a>"
-        text = f"# {topic_link}<br>" + text
-    # 获取富文本节点
-    rich_text_nodes = summary["rich_text_nodes"]
-    for node in rich_text_nodes:
-        # 表情包
-        if node["type"] == "RICH_TEXT_NODE_TYPE_EMOJI":
-            emoji_info = node["emoji"]
-            placeholder = emoji_info["text"]  # 例如 "[脱单doge]"
-            img_tag = f"<img src='{emoji_info['icon_url']}'>"
-            # 替换文本中的占位符
-            text = text.replace(placeholder, img_tag)
-        # 话题形如"#一个话题#"，实际是跳转搜索
-        elif node["type"] == "RICH_TEXT_NODE_TYPE_TOPIC":
-            topic_info = node["text"]
-            topic_url = node["jump_url"]
-            topic_tag = f"<a href='https:{topic_url}'>{topic_info}</a>"
-            # 替换文本中的占位符
-            text = text.replace(topic_info, topic_tag)
-
-    return text
-
-
-async def is_height_valid(img_path: str, max_height: int = 25000) -> bool:
+    return render_rich_text(summary, topic)
+
+
+async def is_height_valid(img_path: str, max_height: int = MAX_IMAGE_HEIGHT) -> bool:
     """
-    检查图片高度是否在允许范围内
+    检查图片高度是否在允许范围内（仅读取文件头）
     :param img_path: 图片文件路径
     :param max_height: 最大允许高度
     :return: 如果图片高度小于等于max_height则返回True，否则返回False
     """
-
+    size = read_image_size(img_path)
+    if size:
+        return size[1] <= max_height
     try:
         with PILImage.open(img_path) as img:
             _, height = img.size